@@ -33,7 +33,7 @@ class ClassAdmin(admin.ModelAdmin):
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ['student', 'date', 'status', 'class_name', 'division']
     list_filter = ['status', 'date', 'class_name']
-    search_fields = ['student__name', 'marked_by']
+    search_fields = ['student__name', 'teacher__name']
     date_hierarchy = 'date'
 
 @admin.register(Leave)
@@ -0,0 +1,156 @@
+import re
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, F, Value
+
+from .models import Attendance, Marks, AttendanceArchive, MarksArchive, ArchivedYear, academic_year_of
+
+# live model -> archive model with the same columns
+ARCHIVES = {Attendance: AttendanceArchive, Marks: MarksArchive}
+CATCH_ALL_PARTITION = 'p_future'
+YEAR_PARTITION_RE = re.compile(r'^p(\d{4})$')
+
+
+def current_academic_year():
+    return academic_year_of(date.today())
+
+
+def archived_years(model, filters):
+    """Archived academic years of ``model`` that the ``academic_year`` lookups in ``filters`` reach.
+
+    Reads that name no year or date range get [], as do reads starting in
+    the current academic year, which is never archived, so hot reads skip
+    the lookup.
+    """
+    lookups = {key: value for key, value in filters.items() if key.startswith('academic_year')}
+    if not lookups:
+        return []
+    first_year = lookups.get('academic_year', lookups.get('academic_year__gte'))
+    if first_year is not None and int(first_year) >= current_academic_year():
+        return []
+    return list(
+        ArchivedYear.objects.filter(table=model._meta.db_table, **lookups).values_list('academic_year', flat=True)
+    )
+
+
+def archive_rows(model, years, **filters):
+    """Archived rows of ``model`` for ``years``, filtered with the live model's lookups"""
+    return ARCHIVES[model].objects.filter(academic_year__in=years, **filters)
+
+
+def merged_keys(live, archived, key_field):
+    """``(key, id, is archived)`` of the rows of both querysets, merged newest first in one UNION.
+
+    Only the key columns cross the union; ``merged_rows`` loads the rows a
+    page needs afterwards.
+    """
+    def keys(queryset, is_archived):
+        return queryset.order_by().annotate(
+            is_archived=Value(is_archived, output_field=BooleanField())
+        ).values_list(key_field, 'id', 'is_archived')
+    return keys(live, False).union(keys(archived, True), all=True).order_by(f'-{key_field}', '-id')
+
+
+def merged_rows(keys, live, archived):
+    """The rows ``keys`` (from ``merged_keys``) name, in that order; one query per table"""
+    ids = {False: [], True: []}
+    for _, pk, is_archived in keys:
+        ids[bool(is_archived)].append(pk)
+    rows = {}
+    for is_archived, queryset in ((False, live), (True, archived)):
+        if ids[is_archived]:
+            rows.update(((is_archived, row.pk), row) for row in queryset.order_by().filter(pk__in=ids[is_archived]))
+    return [rows[bool(is_archived), pk] for _, pk, is_archived in keys if (bool(is_archived), pk) in rows]
+
+
+def year_filters(start_date=None, end_date=None):
+    """``academic_year`` lookups matching a date range, so MySQL reads only those partitions"""
+    filters = {}
+    if start_date:
+        filters['academic_year__gte'] = academic_year_of(start_date)
+    if end_date:
+        filters['academic_year__lte'] = academic_year_of(end_date)
+    return filters
+
+
+def _copy_rows(source, target, columns, year):
+    qn = connection.ops.quote_name
+    column_list = ', '.join(qn(column) for column in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(target)} ({column_list}) SELECT {column_list} FROM {qn(source)} '
+            f'WHERE academic_year = %s',
+            [year],
+        )
+        copied = cursor.rowcount
+        # Raw SQL: the delete signals would take the year out of the roll-ups and dashboards
+        cursor.execute(f'DELETE FROM {qn(source)} WHERE academic_year = %s', [year])
+    return copied
+
+
+def archive_academic_year(model, year):
+    """Move ``model``'s rows of a closed academic year into its archive table; returns rows moved.
+
+    One set-based copy and delete in a transaction. On MySQL the emptied year
+    partition is then dropped.
+    """
+    if year >= current_academic_year():
+        raise ValueError(f'{year} is not a closed academic year')
+    archive = ARCHIVES[model]
+    columns = [field.column for field in archive._meta.concrete_fields]
+    with transaction.atomic():
+        moved = _copy_rows(model._meta.db_table, archive._meta.db_table, columns, year)
+        if moved:
+            archived, _ = ArchivedYear.objects.get_or_create(table=model._meta.db_table, academic_year=year)
+            ArchivedYear.objects.filter(pk=archived.pk).update(rows=F('rows') + moved)
+    # MySQL DDL commits implicitly, so it runs after the move has committed
+    if year in year_partitions(model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {connection.ops.quote_name(model._meta.db_table)} DROP PARTITION p{year}'
+            )
+    return moved
+
+
+def restore_academic_year(model, year):
+    """Move an archived academic year of ``model`` back into the live table; returns rows moved"""
+    archive = ARCHIVES[model]
+    # Generated columns (marks percentage) are recomputed by the live table
+    columns = [field.column for field in model._meta.concrete_fields if not field.generated]
+    with transaction.atomic():
+        moved = _copy_rows(archive._meta.db_table, model._meta.db_table, columns, year)
+        ArchivedYear.objects.filter(table=model._meta.db_table, academic_year=year).delete()
+    return moved
+
+
+def year_partitions(model):
+    """Years that have their own partition of ``model``'s table ([] unless partitioned MySQL)"""
+    if connection.vendor != 'mysql':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT partition_name FROM information_schema.partitions '
+            'WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL',
+            [model._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(int(match.group(1)) for match in map(YEAR_PARTITION_RE.match, names) if match)
+
+
+def add_year_partitions(model, up_to_year):
+    """Split a partition per academic year up to ``up_to_year`` off the catch-all; returns years added"""
+    existing = year_partitions(model)
+    if connection.vendor != 'mysql':
+        return []
+    start = existing[-1] + 1 if existing else current_academic_year()
+    years = list(range(start, up_to_year + 1))
+    if years:
+        partitions = [f'PARTITION p{year} VALUES LESS THAN ({year + 1})' for year in years]
+        partitions.append(f'PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN MAXVALUE')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {connection.ops.quote_name(model._meta.db_table)} '
+                f"REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO ({', '.join(partitions)})"
+            )
+    return years
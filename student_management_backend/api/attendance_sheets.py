@@ -0,0 +1,189 @@
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import User, Class, Attendance, AttendanceSheet, ACADEMIC_YEAR_START_MONTH, parse_class_name
+
+# Attendance-shaped rows read from a sheet get the id ``sheet pk << SLOT_BITS | slot``
+SLOT_BITS = 16
+SHEET_CHUNK_SIZE = 200
+SHEET_ROW_FIELDS = ['student', 'teacher', 'date', 'status', 'class_name', 'division', 'updated_by']
+
+
+def sheet_storage():
+    """Whether attendance is stored as class-day sheets rather than one row per student"""
+    return getattr(settings, 'ATTENDANCE_STORAGE', 'rows') == 'sheets'
+
+
+def sheet_row_id(sheet_pk, slot):
+    return sheet_pk << SLOT_BITS | slot
+
+
+def split_sheet_row_id(row_id):
+    """``(sheet pk, slot)`` of a sheet row id, or None if it is not one"""
+    row_id = str(row_id)
+    if not row_id.isdigit():
+        return None
+    row_id = int(row_id)
+    return row_id >> SLOT_BITS, row_id & ((1 << SLOT_BITS) - 1)
+
+
+def filter_sheets(student_id=None, academic_year=None, academic_year__gte=None, academic_year__lte=None, **filters):
+    """Sheets matching the filters the row-per-student attendance API accepts.
+
+    A student's attendance is read from the sheets of the class they are
+    enrolled in now. Sheets have no
+    ``academic_year`` column, so year lookups become date bounds.
+    """
+    sheets = AttendanceSheet.objects.filter(**filters)
+    first_year = academic_year if academic_year is not None else academic_year__gte
+    last_year = academic_year if academic_year is not None else academic_year__lte
+    if first_year is not None:
+        sheets = sheets.filter(date__gte=date(int(first_year), ACADEMIC_YEAR_START_MONTH, 1))
+    if last_year is not None:
+        sheets = sheets.filter(date__lt=date(int(last_year) + 1, ACADEMIC_YEAR_START_MONTH, 1))
+    if student_id:
+        if not str(student_id).isdigit():
+            return sheets.none()
+        sheets = sheets.filter(school_class__students=student_id)
+    return sheets
+
+
+def sheet_row_values(data, instance=None):
+    """Serializer ``validated_data`` over the fields of the row being updated, if any"""
+    values = {field: getattr(instance, field) for field in SHEET_ROW_FIELDS} if instance is not None else {}
+    values.update(data)
+    return values
+
+
+def sheet_class(values):
+    """Class an attendance row (serializer values) is kept under: the one it names, else the student's"""
+    key = parse_class_name(values.get('class_name'), values.get('division'))
+    class_obj = Class.objects.filter(class_number=key[0], division=key[1]).first() if key else None
+    return class_obj or values['student'].school_class
+
+
+def sheet_row(sheet, slot, status, student):
+    """Unsaved Attendance standing for one marked slot of ``sheet``"""
+    school_class = sheet.school_class
+    return Attendance(
+        id=sheet_row_id(sheet.pk, slot),
+        student=student,
+        teacher=sheet.teacher,
+        date=sheet.date,
+        status=status,
+        class_name=str(school_class.class_number),
+        division=school_class.division,
+        school_class=school_class,
+        updated_by=sheet.updated_by,
+        created_at=sheet.created_at,
+        updated_at=sheet.updated_at,
+    )
+
+
+def _student_key(student_id):
+    return int(student_id) if str(student_id or '').isdigit() else None
+
+
+def sheet_slots(sheets, student_id=None):
+    """``(sheet, slot, student id, status)`` of every marked slot of ``sheets``, in the order given"""
+    return [
+        (sheet, slot, marked_id, status)
+        for sheet in sheets
+        for slot, marked_id, status in sheet.marked_slots()
+        if student_id is None or marked_id == student_id
+    ]
+
+
+def slot_rows(slots):
+    """Attendance rows of ``slots``; one query for the students' names.
+
+    Students deleted since the sheet was marked are left out.
+    """
+    students = User.objects.only('id', 'name').in_bulk({marked_id for _, _, marked_id, _ in slots})
+    return [
+        sheet_row(sheet, slot, status, students[marked_id])
+        for sheet, slot, marked_id, status in slots
+        if marked_id in students
+    ]
+
+
+def sheet_rows(sheets, student_id=None):
+    """Attendance rows of ``sheets``, newest day first and in roster order.
+
+    Costs one query for the sheets and one for the names of their students.
+    """
+    sheets = sheets.select_related('school_class', 'teacher').order_by('-date', '-pk')
+    return slot_rows(sheet_slots(sheets, _student_key(student_id)))
+
+
+def sheet_page(sheets, size, student_id=None, after=None):
+    """The next ``size`` attendance rows of ``sheets``, newest day first and in roster order.
+
+    ``after`` is the ``(date, row id)`` of the last row already served.
+    Sheets are read newest first in keyset chunks that grow until the page
+    is full, so a page loads only about the sheets it covers. Returns
+    ``(rows, last)``; ``last`` is the ``(date, row id)`` to continue after,
+    None on the final page.
+    """
+    sheets = sheets.select_related('school_class', 'teacher').order_by('-date', '-pk')
+    student_id = _student_key(student_id)
+    slots = []
+    if after is not None:
+        day, row_id = after
+        sheet_pk, last_slot = split_sheet_row_id(row_id)
+        current = sheets.filter(date=day, pk=sheet_pk).first()
+        if current is not None:
+            slots = [entry for entry in sheet_slots([current], student_id) if entry[1] > last_slot]
+    else:
+        day = sheet_pk = None
+
+    # A student's rows take one sheet each; a class's fill a page from a few
+    chunk = size + 1 if student_id else 2
+    while len(slots) <= size:
+        remaining = sheets if day is None else sheets.filter(Q(date__lt=day) | Q(date=day, pk__lt=sheet_pk))
+        batch = list(remaining[:chunk])
+        slots.extend(sheet_slots(batch, student_id))
+        if len(batch) < chunk:
+            break
+        day, sheet_pk = batch[-1].date, batch[-1].pk
+        chunk = min(chunk * 2, SHEET_CHUNK_SIZE)
+
+    page = slots[:size]
+    last = None
+    if len(slots) > size:
+        sheet, slot = page[-1][0], page[-1][1]
+        last = (sheet.date, sheet_row_id(sheet.pk, slot))
+    return slot_rows(page), last
+
+
+def get_sheet_row(row_id):
+    """The Attendance-shaped row a sheet row id names, or None"""
+    key = split_sheet_row_id(row_id)
+    if key is None:
+        return None
+    sheet_pk, slot = key
+    sheet = AttendanceSheet.objects.select_related('school_class', 'teacher').filter(pk=sheet_pk).first()
+    if sheet is None:
+        return None
+    marked = {marked_slot: (marked_id, status) for marked_slot, marked_id, status in sheet.marked_slots()}
+    if slot not in marked:
+        return None
+    marked_id, status = marked[slot]
+    student = User.objects.only('id', 'name').filter(pk=marked_id).first()
+    return student and sheet_row(sheet, slot, status, student)
+
+
+def iter_sheet_rows(sheets, student_id=None, chunk_size=SHEET_CHUNK_SIZE):
+    """Yield the Attendance rows of ``sheets`` in sheet primary key order, a chunk of sheets at a time"""
+    sheets = sheets.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = sheets if last_pk is None else sheets.filter(pk__gt=last_pk)
+        pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        rows = sheet_rows(AttendanceSheet.objects.filter(pk__in=pks), student_id)
+        yield from sorted(rows, key=lambda row: row.pk)
+        last_pk = pks[-1]
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import authentication, exceptions
+
+from .models import User
+
+TOKEN_SALT = 'api.authentication.token'
+TOKEN_MAX_AGE = getattr(settings, 'API_TOKEN_MAX_AGE', 60 * 60 * 12)
+USER_CACHE_SIZE = getattr(settings, 'API_USER_CACHE_SIZE', 1024)
+# Other worker processes only learn about a change when their entry expires
+USER_CACHE_TTL = getattr(settings, 'API_USER_CACHE_TTL', 300)
+
+
+class UserCache:
+    """Small per-process LRU of users keyed by id, with a TTL per entry"""
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (user, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def password_fingerprint(user):
+    """Short HMAC of the password hash so a password change revokes old tokens"""
+    return salted_hmac(TOKEN_SALT, user.password).hexdigest()[:16]
+
+
+def issue_token(user):
+    """Signed, timestamped access token for ``user``"""
+    return signing.dumps({'uid': user.pk, 'pwd': password_fingerprint(user)}, salt=TOKEN_SALT)
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """``Authorization: Bearer <token>`` where the token comes from ``issue_token``.
+
+    The signature and expiry are checked without touching the database and the
+    user is resolved through ``user_cache``.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+
+        try:
+            payload = signing.loads(auth[1].decode(), salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token has expired')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed('Invalid token')
+
+        user = user_cache.get(payload.get('uid'))
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed('User not found or inactive')
+        if not constant_time_compare(payload.get('pwd', ''), password_fingerprint(user)):
+            raise exceptions.AuthenticationFailed('Token has been revoked')
+        return (user, payload)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,192 @@
+from datetime import date
+
+from django.db.models import Avg, Case, Count, F, Max, OuterRef, Q, Subquery, Value, When
+
+from .models import (
+    User, Attendance, AttendanceSheet, Leave, Subject, Event, Marks, Assignment, Resource, DashboardSnapshot,
+    CLASS_NAME_RE
+)
+from .attendance_sheets import sheet_rows, sheet_storage
+from .mixins import eager_load
+from .query_cache import invalidate
+from .rollups import attendance_totals
+from .serializers import (
+    UserSerializer, ClassSerializer, AttendanceSerializer, LeaveSerializer, SubjectSerializer, EventSerializer
+)
+
+def build_academic_overview(class_obj, subjects, today):
+    """Per-subject marks/assignment/resource summary for a class.
+
+    Runs a fixed number of grouped queries (subjects, marks, assignments)
+    no matter how many subjects the class has.
+    """
+    class_filter = {'school_class': class_obj}
+    latest_resources = Resource.objects.filter(
+        subject=OuterRef('name'), **class_filter
+    ).order_by('-created_at')
+    subjects = subjects.annotate(
+        latest_resource_title=Subquery(latest_resources.values('title')[:1]),
+        latest_resource_at=Subquery(latest_resources.values('created_at')[:1]),
+    )
+    subject_names = subjects.values('name')
+
+    marks_by_subject = {
+        row['subject']: row
+        for row in Marks.objects.filter(subject__in=subject_names, **class_filter)
+        .values('subject')
+        .annotate(average=Avg('percentage'), last_updated=Max('updated_at'))
+    }
+    assignments_by_subject = {
+        row['subject']: row
+        for row in Assignment.objects.filter(subject__in=subject_names, **class_filter)
+        .values('subject')
+        .annotate(
+            pending=Count('id', filter=Q(due_date__gte=today)),
+            last_created=Max('created_at'),
+        )
+    }
+
+    academic_overview = []
+    for subject in subjects:
+        marks = marks_by_subject.get(subject.name, {})
+        assignments = assignments_by_subject.get(subject.name, {})
+
+        # Last Updated (Max of created_at/updated_at from all related models)
+        dates = [
+            d for d in (
+                subject.latest_resource_at,
+                assignments.get('last_created'),
+                marks.get('last_updated'),
+            ) if d is not None
+        ]
+
+        academic_overview.append({
+            'name': subject.name,
+            'averageMarks': round(marks['average'], 1) if marks.get('average') is not None else 0,
+            'pendingAssignments': assignments.get('pending', 0),
+            'latestResource': subject.latest_resource_title or "No resources",
+            'lastUpdated': max(dates).strftime("%Y-%m-%d") if dates else "N/A"
+        })
+    return academic_overview
+
+
+def build_teacher_dashboard(class_obj, today=None):
+    """Compute the class teacher dashboard payload from the live tables"""
+    today = today or date.today()
+    teacher = class_obj.class_teacher
+
+    # Get all students in this class
+    students = User.objects.filter(school_class=class_obj, role='student')
+
+    # Get today's attendance
+    if sheet_storage():
+        attendance_today = sheet_rows(AttendanceSheet.objects.filter(date=today, school_class=class_obj))
+    else:
+        attendance_today = eager_load(
+            Attendance.objects.filter(date=today, school_class=class_obj), AttendanceSerializer()
+        )
+    # Roll-ups are keyed by class number and division
+    attendance_counts = attendance_totals(
+        date=today,
+        class_name=str(class_obj.class_number),
+        division=class_obj.division
+    )
+
+    # Get pending leave requests for this class
+    pending_leaves = Leave.objects.filter(status='Pending', student__school_class=class_obj)
+
+    # Get events for this class
+    events = Event.objects.filter(
+        class_name=str(class_obj.class_number)
+    ).order_by('-date')
+
+    # Get subjects for this class
+    subjects = Subject.objects.filter(school_class=class_obj).select_related('class_teacher')
+
+    return {
+        'class': ClassSerializer(class_obj).data,
+        'teacher': UserSerializer(teacher).data,
+        'students': UserSerializer(students, many=True).data,
+        'attendance_today': AttendanceSerializer(attendance_today, many=True).data,
+        'pending_leaves': LeaveSerializer(eager_load(pending_leaves, LeaveSerializer()), many=True).data,
+        'events': EventSerializer(events, many=True).data,
+        'subjects': SubjectSerializer(subjects, many=True).data,
+        'academic_overview': build_academic_overview(class_obj, subjects, today),
+        'total_students': class_obj.students_count,
+        'present_today': attendance_counts['present'],
+        'absent_today': attendance_counts['absent'],
+    }
+
+
+def rebuild_dashboard_snapshot(class_obj, today=None):
+    """Recompute and store the snapshot for a class, returning the payload.
+
+    The snapshot is only marked clean if nothing dirtied it while the payload
+    was being built; otherwise the next read rebuilds it again.
+    """
+    today = today or date.today()
+    snapshot, _ = DashboardSnapshot.objects.get_or_create(
+        school_class=class_obj,
+        defaults={'snapshot_date': today},
+    )
+    version = snapshot.version
+    payload = build_teacher_dashboard(class_obj, today)
+    DashboardSnapshot.objects.filter(pk=snapshot.pk).update(
+        payload=payload,
+        snapshot_date=today,
+        is_dirty=Case(When(version=version, then=Value(False)), default=Value(True)),
+    )
+    return payload
+
+
+def get_teacher_dashboard(class_obj):
+    """Serve the stored snapshot for a class, rebuilding it if it is stale.
+
+    ``class_obj`` should be fetched with ``select_related('dashboard_snapshot')``
+    so that a clean snapshot is served without any further query.
+    """
+    today = date.today()
+    try:
+        snapshot = class_obj.dashboard_snapshot
+    except DashboardSnapshot.DoesNotExist:
+        snapshot = None
+
+    if snapshot is not None and not snapshot.is_dirty and snapshot.snapshot_date == today:
+        return snapshot.payload
+    return rebuild_dashboard_snapshot(class_obj, today)
+
+
+def mark_dashboards_dirty(class_name=None, division=None):
+    """Flag the snapshots of the classes matching a class name as stale.
+
+    ``class_name`` may be a bare number ("9") or include the division ("9A").
+    When no class can be derived every snapshot is flagged.
+    """
+    snapshots = DashboardSnapshot.objects.all()
+    match = CLASS_NAME_RE.match(str(class_name)) if class_name else None
+    if match:
+        snapshots = snapshots.filter(school_class__class_number=int(match.group(1)))
+        division = division or match.group(2)
+        if division:
+            snapshots = snapshots.filter(school_class__division=division.upper())
+    snapshots.update(is_dirty=True, version=F('version') + 1)
+    # Cached dashboard responses are keyed on this version
+    invalidate(DashboardSnapshot)
+
+
+def mark_class_dashboards_dirty(class_ids):
+    """Flag the snapshots of the classes with the given ids as stale"""
+    class_ids = [pk for pk in class_ids if pk]
+    if class_ids:
+        DashboardSnapshot.objects.filter(school_class_id__in=class_ids).update(
+            is_dirty=True, version=F('version') + 1
+        )
+        invalidate(DashboardSnapshot)
+
+
+def mark_teacher_dashboard_dirty(teacher_id):
+    """Flag the snapshot of the class a teacher is class teacher of"""
+    DashboardSnapshot.objects.filter(school_class__class_teacher_id=teacher_id).update(
+        is_dirty=True, version=F('version') + 1
+    )
+    invalidate(DashboardSnapshot)
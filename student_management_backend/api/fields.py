@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils.functional import cached_property
+
+
+class CodedChoiceField(models.PositiveSmallIntegerField):
+    """String choices stored as small integer codes.
+
+    Python code, filters and serializers keep using the string values
+    (``status='Present'``); only the column holds ``codes[value]``. Codes must
+    never be renumbered once rows exist.
+    """
+
+    def __init__(self, *args, codes=None, **kwargs):
+        self.codes = dict(codes or {})
+        self.values_by_code = {code: value for value, code in self.codes.items()}
+        self.folded_codes = {value.casefold(): code for value, code in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['codes'] = self.codes
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # The Python value is the string, so the integer range validators do not apply
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.values_by_code.get(value, value)
+
+    def to_python(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return self.values_by_code.get(value, value)
+        return value
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None or isinstance(value, int):
+            return value
+        # Matches the case-insensitive comparison the VARCHAR column had under MySQL.
+        # Unknown strings match nothing in lookups and fail NOT NULL on save
+        code = self.codes.get(value)
+        if code is None and isinstance(value, str):
+            code = self.folded_codes.get(value.casefold())
+        return code
@@ -0,0 +1,195 @@
+from django.db import transaction
+from django.db.models import CharField, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Replace, Upper
+from django.utils import timezone
+
+from .archive import current_academic_year
+from .authentication import user_cache
+from .dashboards import mark_class_dashboards_dirty
+from .models import User, Class, Attendance, Marks
+from .query_cache import invalidate
+from .rollups import counted_students_count, refresh_students_counts
+from .services import CLASS_NAME_FIELDS
+
+CHUNK_SIZE = 2000
+
+
+def named_class_id(model):
+    """Subquery: id of the Class named by the outer ``model`` row's class name/division strings.
+
+    Read the way ``parse_class_name`` reads them, so the audit and the linker
+    agree: case and spaces are ignored, and "9a" with an empty division names 9A.
+    """
+    name_field, division_field = CLASS_NAME_FIELDS[model]
+    classes = Class.objects.annotate(
+        label=Concat(Cast('class_number', CharField()), 'division', output_field=CharField())
+    )
+    name = Upper(Replace(OuterRef(name_field), Value(' '), Value('')))
+    if division_field is None:
+        classes = classes.filter(label=name)
+    else:
+        division = Upper(Replace(
+            Coalesce(OuterRef(division_field), Value(''), output_field=CharField()), Value(' '), Value('')
+        ))
+        classes = classes.filter(
+            Q(label=Concat(name, division, output_field=CharField())) | Q(label=name, division=division)
+        )
+    return Subquery(classes.order_by().values('pk')[:1])
+
+
+def names_class(model):
+    """Rows of ``model`` that name a class at all"""
+    name_field, _ = CLASS_NAME_FIELDS[model]
+    return model.objects.exclude(**{f'{name_field}__isnull': True}).exclude(**{name_field: ''})
+
+
+def unlinked_rows(model):
+    """Rows naming an existing class without pointing at it"""
+    return names_class(model).filter(school_class__isnull=True).alias(
+        named=named_class_id(model)
+    ).filter(named__isnull=False)
+
+
+def missing_class_rows(model):
+    """Rows naming a class that does not exist"""
+    return names_class(model).filter(school_class__isnull=True).alias(
+        named=named_class_id(model)
+    ).filter(named__isnull=True)
+
+
+def link_rows(model):
+    def repair(pks):
+        rows = model.objects.filter(pk__in=pks)
+        class_ids = set(rows.values_list(named_class_id(model), flat=True))
+        fixed = rows.update(school_class_id=named_class_id(model), updated_at=timezone.now())
+        # update() skips the signals that keep the counts, dashboards and user cache right
+        if model is User:
+            refresh_students_counts(class_ids)
+            for pk in pks:
+                user_cache.invalidate(pk)
+        mark_class_dashboards_dirty(class_ids)
+        invalidate(model)
+        return fixed
+    return repair
+
+
+def missing_user_rows(model, field):
+    """Rows of a table without database foreign keys whose ``field`` user no longer exists"""
+    return model.objects.filter(~Exists(User.objects.filter(pk=OuterRef(f'{field}_id'))))
+
+
+def delete_rows(model):
+    def repair(pks):
+        # Deleted through the ORM so the roll-ups and dashboards follow
+        return model.objects.filter(pk__in=pks).delete()[1].get(model._meta.label, 0)
+    return repair
+
+
+def class_mismatch_rows(model):
+    """This year's rows filed under a class other than their student's current class"""
+    return model.objects.filter(
+        academic_year=current_academic_year(), student__school_class__isnull=False
+    ).exclude(school_class_id=F('student__school_class_id'))
+
+
+def students_without_class():
+    return User.objects.filter(role='student', is_active=True, school_class__isnull=True).filter(
+        Q(className__isnull=True) | Q(className='')
+    )
+
+
+def stale_teacher_name():
+    name = User.objects.filter(pk=OuterRef('class_teacher_id')).values('name')[:1]
+    return Class.objects.alias(teacher_name=Subquery(name)).filter(
+        Q(teacher_name__isnull=True, class_teacher_name__isnull=False)
+        | Q(teacher_name__isnull=False, class_teacher_name__isnull=True)
+        | Q(teacher_name__isnull=False, class_teacher_name__isnull=False)
+        & ~Q(class_teacher_name=F('teacher_name'))
+    )
+
+
+def repair_teacher_name(pks):
+    name = User.objects.filter(pk=OuterRef('class_teacher_id')).values('name')[:1]
+    fixed = Class.objects.filter(pk__in=pks).update(class_teacher_name=Subquery(name), updated_at=timezone.now())
+    mark_class_dashboards_dirty(pks)
+    invalidate(Class)
+    return fixed
+
+
+def wrong_students_count():
+    return Class.objects.alias(counted=counted_students_count()).exclude(students_count=F('counted'))
+
+
+def repair_students_count(pks):
+    fixed = len(refresh_students_counts(pks))
+    mark_class_dashboards_dirty(pks)
+    return fixed
+
+
+def build_checks():
+    """``{name: (description, find, fields shown, repair or None)}`` in repair order.
+
+    ``find`` returns a queryset of the offending rows, built from anti-joins so
+    every check is a handful of set-based queries. Checks without a repair
+    need a person to decide, e.g. a student who changed division mid-year.
+    """
+    checks = {}
+    for model, (name_field, division_field) in CLASS_NAME_FIELDS.items():
+        table = model._meta.db_table
+        fields = ('pk', name_field) + ((division_field,) if division_field else ())
+        checks[f'{table}-unlinked-class'] = (
+            f'{table} naming an existing class without linking it',
+            lambda model=model: unlinked_rows(model), fields, link_rows(model),
+        )
+        checks[f'{table}-missing-class'] = (
+            f'{table} naming a class that does not exist',
+            lambda model=model: missing_class_rows(model), fields, None,
+        )
+    checks['students-without-class'] = (
+        'active students with no class', students_without_class, ('pk', 'email'), None,
+    )
+    for model in (Attendance, Marks):
+        table = model._meta.db_table
+        for field in ('student', 'teacher'):
+            checks[f'{table}-missing-{field}'] = (
+                f'{table} rows whose {field} no longer exists',
+                lambda model=model, field=field: missing_user_rows(model, field),
+                ('pk', f'{field}_id'), delete_rows(model),
+            )
+        checks[f'{table}-class-mismatch'] = (
+            f"this year's {table} filed under a class other than the student's",
+            lambda model=model: class_mismatch_rows(model),
+            ('pk', 'student_id', 'school_class_id', 'student__school_class_id'), None,
+        )
+    checks['stale-class-teacher-name'] = (
+        "classes whose class_teacher_name is not their teacher's name",
+        stale_teacher_name, ('pk', 'class_teacher_id', 'class_teacher_name'), repair_teacher_name,
+    )
+    checks['students-count'] = (
+        'classes whose students_count is wrong', wrong_students_count, ('pk', 'students_count'),
+        repair_students_count,
+    )
+    return checks
+
+
+CHECKS = build_checks()
+
+
+def sample_rows(queryset, fields, limit):
+    """The first ``limit`` offending rows as tuples of ``fields``"""
+    return list(queryset.order_by('pk').values_list(*fields)[:limit].iterator(chunk_size=CHUNK_SIZE))
+
+
+def repair_rows(find, repair, chunk_size=CHUNK_SIZE):
+    """Repair the rows ``find`` returns a keyset chunk at a time, one transaction per chunk; returns rows fixed"""
+    fixed, last_pk = 0, None
+    while True:
+        rows = find().order_by('pk')
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        pks = list(rows.values_list('pk', flat=True)[:chunk_size].iterator(chunk_size=chunk_size))
+        if not pks:
+            return fixed
+        with transaction.atomic():
+            fixed += repair(pks)
+        last_pk = pks[-1]
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.archive import (
+    ARCHIVES, add_year_partitions, archive_academic_year, current_academic_year, restore_academic_year
+)
+
+TABLES = {model._meta.db_table: model for model in ARCHIVES}
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the attendance and marks of closed academic years into the compressed archive tables, '
+        'or move one year back with --restore'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', type=int,
+            help='Archive academic years before this one (default: the current academic year)'
+        )
+        parser.add_argument('--restore', type=int, metavar='YEAR', help='Move this archived year back')
+        parser.add_argument('--tables', nargs='+', choices=sorted(TABLES), default=sorted(TABLES))
+        parser.add_argument('--dry-run', action='store_true', help='Only report the rows each year would move')
+
+    def handle(self, *args, **options):
+        current = current_academic_year()
+        before = options['before'] or current
+        if before > current:
+            raise CommandError(f'Academic year {current} is still open')
+
+        for table in options['tables']:
+            model = TABLES[table]
+            if options['restore']:
+                year = options['restore']
+                if options['dry_run']:
+                    moved = ARCHIVES[model].objects.filter(academic_year=year).count()
+                else:
+                    moved = restore_academic_year(model, year)
+                self.stdout.write(f'{table} {year}: {moved} row(s) restored')
+                continue
+
+            counts = dict(
+                model.objects.filter(academic_year__lt=before).order_by()
+                .values_list('academic_year').annotate(rows=Count('pk'))
+            )
+            for year in sorted(counts):
+                moved = counts[year] if options['dry_run'] else archive_academic_year(model, year)
+                self.stdout.write(f'{table} {year}: {moved} row(s) archived')
+            if not options['dry_run']:
+                # Keep next year's rows out of the catch-all partition on MySQL
+                add_year_partitions(model, current + 1)
+
+        self.stdout.write(self.style.SUCCESS('Dry run, nothing moved' if options['dry_run'] else 'Done'))
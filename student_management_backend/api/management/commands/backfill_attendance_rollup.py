@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.rollups import rebuild_attendance_rollup
+
+
+class Command(BaseCommand):
+    help = 'Build the daily per-class attendance roll-up from the attendance rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last date to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for option in ('start_date', 'end_date'):
+            value = options[option]
+            if value and parse_date(value) is None:
+                raise CommandError(f'--{option.replace("_", "-")} must be in YYYY-MM-DD format')
+            dates[option] = parse_date(value) if value else None
+
+        count = rebuild_attendance_rollup(**dates)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} attendance roll-up row(s)'))
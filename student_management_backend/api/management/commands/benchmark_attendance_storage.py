@@ -0,0 +1,120 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.attendance_sheets import sheet_rows
+from api.management.commands.table_sizes import table_sizes
+from api.mixins import eager_load
+from api.models import User, Class, Attendance, AttendanceSheet
+from api.serializers import AttendanceSerializer
+from api.services import bulk_mark_attendance, mark_attendance_sheet
+
+
+def read_rows(class_obj, day):
+    return AttendanceSerializer(
+        eager_load(Attendance.objects.filter(school_class=class_obj, date=day), AttendanceSerializer()), many=True
+    ).data
+
+
+def read_sheet(class_obj, day):
+    return AttendanceSerializer(
+        sheet_rows(AttendanceSheet.objects.filter(school_class=class_obj, date=day)), many=True
+    ).data
+
+
+LAYOUTS = {
+    'rows': (bulk_mark_attendance, read_rows, Attendance),
+    'sheets': (mark_attendance_sheet, read_sheet, AttendanceSheet),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare the row-per-student and class-day sheet attendance layouts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[40, 200], help='Students per class')
+        parser.add_argument('--days', type=int, default=60, help='School days marked per run')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'students':>8} {'layout':<7} {'mark ms':>8} {'mark q':>7} {'read ms':>8} {'read q':>7} "
+            f"{'rows':>7} {'bytes/day':>10}"
+        )
+        for size in options['sizes']:
+            for layout in LAYOUTS:
+                mark_ms, mark_queries, read_ms, read_queries, rows, size_bytes = self.run_once(
+                    size, options['days'], layout
+                )
+                per_day = f'{size_bytes / options["days"]:.0f}' if size_bytes is not None else 'n/a'
+                self.stdout.write(
+                    f'{size:>8} {layout:<7} {mark_ms:>8.2f} {mark_queries:>7} {read_ms:>8.2f} {read_queries:>7} '
+                    f'{rows:>7} {per_day:>10}'
+                )
+
+    def run_once(self, size, days, layout):
+        """Mark ``days`` class-days (plus a re-mark of each) and read them back, on throwaway data.
+
+        Marking is reported per class-day including the re-mark, reading per
+        class-day. Storage is the growth of the layout's table, data plus indexes.
+        """
+        mark, read, model = LAYOUTS[layout]
+        table = model._meta.db_table
+        with transaction.atomic():
+            teacher = User.objects.create(
+                email='benchmark-teacher@example.com', name='Benchmark Teacher',
+                role='teacher', password=make_password(None)
+            )
+            class_obj = Class.objects.create(class_number=10, division='Z', class_teacher=teacher)
+            students = User.objects.bulk_create([
+                User(email=f'benchmark-student-{i}@example.com', name=f'Student {i}', role='student',
+                     className='10', division='Z', password=make_password(None))
+                for i in range(size)
+            ])
+            records = [{'studentId': s.id, 'present': i % 5 != 0} for i, s in enumerate(students)]
+            remark = [{'studentId': s.id, 'present': i % 3 != 0} for i, s in enumerate(students)]
+            day_list = [date.today() - timedelta(days=n) for n in range(days)]
+            size_before = self.table_bytes(table)
+
+            with CaptureQueriesContext(connection) as marking:
+                start = time.perf_counter()
+                for day in day_list:
+                    mark(class_obj, teacher, day, records)
+                    mark(class_obj, teacher, day, remark)
+                mark_elapsed = time.perf_counter() - start
+
+            with CaptureQueriesContext(connection) as reading:
+                start = time.perf_counter()
+                for day in day_list:
+                    read(class_obj, day)
+                read_elapsed = time.perf_counter() - start
+
+            rows = model.objects.filter(school_class=class_obj).count()
+            size_after = self.table_bytes(table)
+            transaction.set_rollback(True)
+
+        size_bytes = size_after - size_before if size_before is not None else None
+        return (
+            mark_elapsed * 1000 / days, len(marking.captured_queries) // days,
+            read_elapsed * 1000 / days, len(reading.captured_queries) // days,
+            rows, size_bytes,
+        )
+
+    @staticmethod
+    def table_bytes(table):
+        """Data plus index bytes of ``table``, or None where the backend cannot report it.
+
+        InnoDB sizes are refreshed by ANALYZE TABLE, not by uncommitted writes,
+        so MySQL runs only compare timings and queries.
+        """
+        if connection.vendor == 'mysql':
+            return None
+        try:
+            with transaction.atomic():
+                _, data, index = table_sizes([table]).get(table, (0, 0, 0))
+        except (CommandError, DatabaseError):
+            return None
+        return data + index
@@ -0,0 +1,78 @@
+import time
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+
+from api.models import User, Class, Attendance
+from api.services import bulk_mark_attendance
+
+
+class QueryCounter:
+    """Execute wrapper counting every query; the debug query log keeps only the last 9000"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Compare the row-by-row and bulk upsert attendance marking paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[40, 200, 2000])
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per size; the best run is reported')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'records':>8} {'path':<10} {'best ms':>10} {'queries':>8}")
+        for size in options['sizes']:
+            for label, mark in (('row', self.mark_row_by_row), ('bulk', bulk_mark_attendance)):
+                best, queries = None, 0
+                for _ in range(options['repeat']):
+                    elapsed, queries = self.run_once(size, mark)
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(f'{size:>8} {label:<10} {best * 1000:>10.1f} {queries:>8}')
+
+    def run_once(self, size, mark):
+        """Time one marking pass (first mark plus a re-mark) on throwaway data"""
+        with transaction.atomic():
+            teacher = User.objects.create(
+                email='benchmark-teacher@example.com', name='Benchmark Teacher',
+                role='teacher', password=make_password(None)
+            )
+            class_obj = Class.objects.create(class_number=10, division='Z', class_teacher=teacher)
+            students = User.objects.bulk_create([
+                User(email=f'benchmark-student-{i}@example.com', name=f'Student {i}', role='student',
+                     className='10', division='Z', password=make_password(None))
+                for i in range(size)
+            ])
+            records = [{'studentId': s.id, 'present': i % 5 != 0} for i, s in enumerate(students)]
+            remark = [{'studentId': s.id, 'present': i % 3 != 0} for i, s in enumerate(students)]
+
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                mark(class_obj, teacher, date.today(), records)
+                mark(class_obj, teacher, date.today(), remark)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed, counter.count
+
+    @staticmethod
+    def mark_row_by_row(class_obj, teacher, day, records):
+        """The previous bulk_mark implementation: get, delete and insert per record"""
+        for record in records:
+            student = User.objects.get(id=record['studentId'])
+            Attendance.objects.filter(student_id=student.id, date=day).delete()
+            Attendance.objects.create(
+                student=student,
+                teacher=teacher,
+                date=day,
+                status='Present' if record.get('present', False) else 'Absent',
+                class_name=str(class_obj.class_number),
+                division=class_obj.division
+            )
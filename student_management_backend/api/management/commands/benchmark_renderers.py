@@ -0,0 +1,73 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api import renderers
+from api.management.seeding import seed_school
+
+
+def available_renderers():
+    """``{label: renderer}`` of the encoders installed here, DRF's stock one first"""
+    found = {'drf-json': JSONRenderer()}
+    if renderers.orjson is not None:
+        found['orjson'] = renderers.FastJSONRenderer()
+    if renderers.msgpack is not None:
+        found['msgpack'] = renderers.MessagePackRenderer()
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare encode time and payload size of the JSON and MessagePack renderers on the '
+        'marks-by-class and teacher dashboard payloads'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000], help='Rows per table')
+        parser.add_argument('--repeat', type=int, default=20, help='Encodes per renderer; the best is reported')
+
+    def handle(self, *args, **options):
+        encoders = available_renderers()
+        missing = [name for name, module in (('orjson', renderers.orjson), ('msgpack', renderers.msgpack))
+                   if module is None]
+        if missing:
+            self.stdout.write(f"Not installed, skipped: {', '.join(missing)}")
+
+        self.stdout.write(f"{'rows':>6} {'payload':<10} {'renderer':<9} {'best ms':>8} {'bytes':>9} {'gzip':>8}")
+        for size in options['sizes']:
+            for payload, data in self.payloads(size).items():
+                for label, renderer in encoders.items():
+                    best, content = None, b''
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        content = renderer.render(data, renderer.media_type, {})
+                        elapsed = time.perf_counter() - start
+                        best = elapsed if best is None else min(best, elapsed)
+                    self.stdout.write(
+                        f'{size:>6} {payload:<10} {label:<9} {best * 1000:>8.2f} {len(content):>9} '
+                        f'{len(gzip.compress(content)):>8}'
+                    )
+
+    @staticmethod
+    def payloads(size):
+        """Response data of both endpoints over ``size`` seeded rows, read with the caches off"""
+        with override_settings(QUERY_CACHE_ALIAS=None), transaction.atomic():
+            ids = seed_school(size)
+            client = APIClient(SERVER_NAME='localhost')
+            urls = {
+                'by-class': f"/api/marks/by_class/?class_id={ids['class']}",
+                'dashboard': f"/api/classes/teacher_dashboard/?teacher_id={ids['teacher']}",
+            }
+            data = {}
+            for name, url in urls.items():
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'GET {url} returned {response.status_code}')
+                data[name] = response.data
+            transaction.set_rollback(True)
+        return data
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.integrity import CHECKS, CHUNK_SIZE, repair_rows, sample_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Find dangling class links, orphaned attendance/marks, stale class teacher names and wrong '
+        'students counts with set-based queries, and optionally repair them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', nargs='+', choices=list(CHECKS), default=list(CHECKS))
+        parser.add_argument('--repair', action='store_true', help='Fix what can be fixed automatically')
+        parser.add_argument('--show', type=int, default=5, help='Offending rows printed per check')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        failures = []
+        for name in options['checks']:
+            description, find, fields, repair = CHECKS[name]
+            if options['repair'] and repair:
+                fixed = repair_rows(find, repair, options['chunk_size'])
+                if fixed:
+                    self.stdout.write(f'{name}: repaired {fixed} row(s)')
+            found = find().count()
+            if not found:
+                self.stdout.write(f'{name}: ok')
+                continue
+            self.stdout.write(self.style.WARNING(f'{name}: {found} {description}'))
+            for row in sample_rows(find(), fields, options['show']):
+                self.stdout.write('  ' + ', '.join(f'{field}={value}' for field, value in zip(fields, row)))
+            failures.append(f'{name} ({found})' + ('' if repair else ', needs review'))
+
+        if failures:
+            raise CommandError('Integrity problems found:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No integrity problems found'))
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import DEFAULT_IMPORT_PASSWORD, import_users, read_user_rows
+
+
+class Command(BaseCommand):
+    help = 'Import students and teachers from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSON list of users')
+        parser.add_argument('--default-password', default=DEFAULT_IMPORT_PASSWORD,
+                            help='Password for rows that do not set one')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        try:
+            rows = read_user_rows(path.read_bytes(), path.name)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        created_count, errors = import_users(
+            rows,
+            default_password=options['default_password'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+        )
+        for error in errors:
+            self.stderr.write(f"Row {error['row']} ({error['email'] or 'no email'}): {'; '.join(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f'Imported {created_count} user(s), rejected {len(errors)} row(s)'))
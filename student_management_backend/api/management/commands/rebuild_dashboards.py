@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboards import rebuild_dashboard_snapshot
+from api.models import Class
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stored class teacher dashboard snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, help='Only rebuild the snapshot of this class')
+
+    def handle(self, *args, **options):
+        classes = Class.objects.filter(class_teacher__isnull=False).select_related('class_teacher')
+        if options['class_id']:
+            classes = classes.filter(id=options['class_id'])
+
+        count = 0
+        for class_obj in classes:
+            rebuild_dashboard_snapshot(class_obj)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} dashboard snapshot(s)'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import refresh_students_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount Class.students_count from the enrolled students and report classes that had drifted'
+
+    def handle(self, *args, **options):
+        drifted = refresh_students_counts()
+        for class_id, stored, counted in drifted:
+            self.stdout.write(f'class {class_id}: stored {stored}, counted {counted}')
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} class(es) corrected'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import refresh_school_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the school-wide counters used by the admin dashboard'
+
+    def handle(self, *args, **options):
+        counters = refresh_school_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'{counters.students} students, {counters.teachers} teachers, {counters.classes} classes, '
+            f'{counters.present_today}/{counters.total_today} present today'
+        ))
@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.archive import ARCHIVES, add_year_partitions, current_academic_year
+from api.models import User, parse_class_name
+from api.rollover import FINAL_CLASS, TEACHER_MODES, rollover_academic_year
+from api.services import read_user_rows
+
+
+def read_assignments(path):
+    """``{(class_number, division): teacher id}`` from CSV/JSON ``class`` ("9A") and ``teacher`` (email or id) rows.
+
+    Classes are checked by the rollover, which may create them.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        rows = read_user_rows(f.read(), path)
+    teachers = {
+        email.lower(): pk for email, pk in User.objects.filter(role='teacher').values_list('email', 'pk')
+    }
+    teacher_ids = set(teachers.values())
+    assignments = {}
+    for number, row in enumerate(rows, start=1):
+        parsed = parse_class_name(row.get('class'))
+        teacher = str(row.get('teacher') or '').strip()
+        teacher_id = int(teacher) if teacher.isdigit() else teachers.get(teacher.lower())
+        if parsed is None or teacher_id not in teacher_ids:
+            raise CommandError(f'Row {number}: unknown class or teacher in {row}')
+        assignments[parsed] = teacher_id
+    return assignments
+
+
+class Command(BaseCommand):
+    help = (
+        'Close an academic year: snapshot class membership, graduate the final class, '
+        'promote every other class and reassign class teachers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year', type=int, help='Academic year being closed (default: the current academic year)'
+        )
+        parser.add_argument('--final-class', type=int, default=FINAL_CLASS, help='Class that graduates')
+        parser.add_argument(
+            '--teachers', choices=TEACHER_MODES, default='keep',
+            help='keep teachers with their class, have them follow their students up, or clear them'
+        )
+        parser.add_argument(
+            '--assign', metavar='PATH',
+            help='CSV or JSON file of class,teacher rows applied after --teachers'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Run the rollover and roll it back')
+
+    def handle(self, *args, **options):
+        year = options['year'] or current_academic_year()
+        assignments = read_assignments(options['assign']) if options['assign'] else None
+
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                summary = rollover_academic_year(
+                    year, final_class=options['final_class'], teachers=options['teachers'],
+                    assignments=assignments,
+                )
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"Snapshot: {summary['snapshot']} membership(s) of {year}")
+        self.stdout.write(f"Graduated: {summary['graduated']}")
+        self.stdout.write(f"Promoted: {summary['promoted']}")
+        if summary['created_classes']:
+            self.stdout.write(f"Created classes: {', '.join(summary['created_classes'])}")
+        self.stdout.write(f"Class teachers changed: {summary['teachers_changed']}")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run in {elapsed:.2f}s, nothing changed'))
+            return
+
+        # Give the new year its own attendance and marks partitions on MySQL
+        for model in ARCHIVES:
+            add_year_partitions(model, year + 1)
+        self.stdout.write(self.style.SUCCESS(f'Rolled over {year} in {elapsed:.2f}s'))
@@ -0,0 +1,58 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+def table_sizes(tables):
+    """``{table: (rows, data bytes, index bytes)}`` as reported by the database"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            # InnoDB figures are estimates; ANALYZE TABLE refreshes them
+            cursor.execute(
+                'SELECT table_name, table_rows, data_length, index_length FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name IN %s',
+                [tuple(tables)],
+            )
+            return {name: (rows, data, index) for name, rows, data, index in cursor.fetchall()}
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT relname, reltuples::bigint, pg_table_size(oid), pg_indexes_size(oid) FROM pg_class '
+                'WHERE relname = ANY(%s)',
+                [list(tables)],
+            )
+            return {name: (rows, data, index) for name, rows, data, index in cursor.fetchall()}
+        if connection.vendor == 'sqlite':
+            # Needs SQLite built with the dbstat virtual table
+            cursor.execute(
+                "SELECT m.tbl_name, m.type, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+                "WHERE m.tbl_name IN (%s) GROUP BY m.tbl_name, m.type" % ', '.join(['%s'] * len(tables)),
+                list(tables),
+            )
+            sizes = {}
+            for name, kind, size in cursor.fetchall():
+                data, index = sizes.get(name, (0, 0))
+                sizes[name] = (data + size, index) if kind == 'table' else (data, index + size)
+            result = {}
+            for name, (data, index) in sizes.items():
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(name)}')
+                result[name] = (cursor.fetchone()[0], data, index)
+            return result
+    raise CommandError(f'Table sizes are not implemented for {connection.vendor}')
+
+
+class Command(BaseCommand):
+    help = 'Report row count, data size and index size of the api tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', help='Tables to report (default: every api table)')
+
+    def handle(self, *args, **options):
+        tables = options['tables'] or sorted(model._meta.db_table for model in apps.get_app_config('api').get_models())
+        sizes = table_sizes(tables)
+        self.stdout.write(f"{'table':<28} {'rows':>10} {'data KiB':>10} {'index KiB':>10} {'bytes/row':>10}")
+        for table in tables:
+            if table not in sizes:
+                continue
+            rows, data, index = sizes[table]
+            per_row = (data + index) / rows if rows else 0
+            self.stdout.write(f'{table:<28} {rows:>10} {data // 1024:>10} {index // 1024:>10} {per_row:>10.1f}')
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+
+from api.models import User, Class, Attendance, Leave, Subject, Event, Marks, Assignment, Resource
+from api.rollups import refresh_school_counters
+
+SEED_DIVISIONS = ['V', 'W', 'X', 'Y', 'Z']
+
+
+def seed_school(size, class_count=1):
+    """Create throwaway classes, each with a class teacher and ``size`` rows per table.
+
+    Meant to run inside a transaction that is rolled back. Returns the ids of
+    one row of each kind, all belonging to the first class.
+    """
+    # The counters row is created on first read; measure the steady state
+    refresh_school_counters()
+    password = make_password(None)
+    today = date.today()
+    ids = {}
+
+    for n in range(class_count):
+        class_number = 10 - (n // len(SEED_DIVISIONS)) % 3
+        division = SEED_DIVISIONS[-1 - n % len(SEED_DIVISIONS)]
+        class_name = str(class_number)
+        teacher = User.objects.create(
+            email=f'seed-teacher-{n}@example.com', name=f'Seed Teacher {n}', role='teacher', password=password
+        )
+        class_obj = Class.objects.create(class_number=class_number, division=division, class_teacher=teacher)
+        students = [
+            User.objects.create(email=f'seed-student-{n}-{i}@example.com', name=f'Student {n}-{i}',
+                                role='student', className=class_name, division=division, password=password)
+            for i in range(size)
+        ]
+        class_ids = {'teacher': teacher.id, 'class': class_obj.id, 'student': students[0].id}
+
+        for i, student in enumerate(students):
+            subject = Subject.objects.create(
+                name=f'Seed Subject {i}', class_name=f'{class_name}{division}', class_teacher=teacher
+            )
+            attendance = Attendance.objects.create(
+                student=student, teacher=teacher, date=today - timedelta(days=i % 3), status='Present',
+                class_name=class_name, division=division
+            )
+            leave = Leave.objects.create(student=student, reason='Seed', start_date=today, end_date=today)
+            event = Event.objects.create(title=f'Seed Event {i}', date=today, audience='CLASS',
+                                         class_name=class_name, division=division)
+            marks = Marks.objects.create(
+                student=student, teacher=teacher, subject=subject.name, class_name=class_name, division=division,
+                exam_type='Mid Term', marks_obtained=50
+            )
+            assignment = Assignment.objects.create(
+                title=f'Seed Assignment {i}', subject=subject.name, class_name=class_name, division=division,
+                due_date=today, teacher=teacher
+            )
+            resource = Resource.objects.create(
+                title=f'Seed Resource {i}', link='https://example.com', subject=subject.name,
+                class_name=class_name, division=division, teacher=teacher
+            )
+            class_ids.update(subject=subject.id, attendance=attendance.id, leave=leave.id, event=event.id,
+                             marks=marks.id, assignment=assignment.id, resource=resource.id)
+        ids = ids or class_ids
+    return ids
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_attendancerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('students', models.IntegerField(default=0)),
+                ('teachers', models.IntegerField(default=0)),
+                ('classes', models.IntegerField(default=0)),
+                ('attendance_date', models.DateField(blank=True, null=True)),
+                ('present_today', models.IntegerField(default=0)),
+                ('total_today', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'school_counters',
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_keyset_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['class_name', 'division', 'subject'], name='assign_class_div_subj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['class_name', 'division', 'due_date'], name='assign_class_div_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['class_name', 'division', 'date'], name='att_class_div_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['audience', 'date'], name='events_audience_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['class_name', 'date'], name='events_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['status', 'created_at'], name='leaves_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marks',
+            index=models.Index(fields=['class_name', 'division', 'subject', 'exam_type'], name='marks_class_div_subj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marks',
+            index=models.Index(fields=['subject', 'exam_type'], name='marks_subject_exam_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['class_name', 'division', 'subject', 'created_at'], name='res_class_div_subj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['class_name'], name='subjects_class_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'className', 'division'], name='users_role_class_div_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:15
+
+import re
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CLASS_NAME_RE = re.compile(r"^\s*(\d+)\s*([A-Za-z]?)\s*$")
+
+# model -> (class name field, division field); subjects store "9A" in one column
+CLASS_NAME_FIELDS = {
+    'user': ('className', 'division'),
+    'attendance': ('class_name', 'division'),
+    'marks': ('class_name', 'division'),
+    'assignment': ('class_name', 'division'),
+    'resource': ('class_name', 'division'),
+    'event': ('class_name', 'division'),
+    'subject': ('class_name', None),
+}
+
+
+def link_school_classes(apps, schema_editor):
+    """Point every row at the Class its class name/division strings name"""
+    Class = apps.get_model('api', 'Class')
+    class_ids = {
+        (number, division.upper()): pk
+        for pk, number, division in Class.objects.values_list('pk', 'class_number', 'division')
+    }
+
+    for model_name, (name_field, division_field) in CLASS_NAME_FIELDS.items():
+        model = apps.get_model('api', model_name)
+        fields = [name_field, division_field] if division_field else [name_field]
+        rows_by_class = defaultdict(list)
+        for values in model.objects.exclude(**{f'{name_field}__isnull': True}).values_list('pk', *fields):
+            pk, class_name, division = values if division_field else (*values, None)
+            match = CLASS_NAME_RE.match(str(class_name or ''))
+            if not match:
+                continue
+            key = (int(match.group(1)), (division or match.group(2)).strip().upper())
+            if key in class_ids:
+                rows_by_class[class_ids[key]].append(pk)
+
+        for class_id, pks in rows_by_class.items():
+            for start in range(0, len(pks), 1000):
+                model.objects.filter(pk__in=pks[start:start + 1000]).update(school_class_id=class_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_filter_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assignments', to='api.class'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_records', to='api.class'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='api.class'),
+        ),
+        migrations.AddField(
+            model_name='marks',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='marks', to='api.class'),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resources', to='api.class'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='class_subjects', to='api.class'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='students', to='api.class'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['school_class', 'date'], name='att_school_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marks',
+            index=models.Index(fields=['school_class', 'subject', 'exam_type'], name='marks_school_class_subj_idx'),
+        ),
+        migrations.RunPython(link_school_classes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount_students(apps, schema_editor):
+    """students_count was never maintained before; start from the real enrolment"""
+    Class = apps.get_model('api', 'Class')
+    User = apps.get_model('api', 'User')
+    students = User.objects.filter(school_class=OuterRef('pk'), role='student').order_by().values('school_class')
+    Class.objects.update(students_count=Coalesce(Subquery(students.annotate(n=Count('pk')).values('n')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_school_class_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_students, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:25
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_recount_students_count'),
+    ]
+
+    # A column cannot be altered into a generated one; dropping and re-adding it
+    # lets the database compute the value for every existing row
+    operations = [
+        migrations.RemoveField(
+            model_name='marks',
+            name='percentage',
+        ),
+        migrations.AddField(
+            model_name='marks',
+            name='percentage',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(total_marks__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '/', models.F('total_marks')), '*', models.Value(100))), default=None), null=True, output_field=models.FloatField()),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_subject_teachers(apps, schema_editor):
+    """Fill the table from Class.subject_teachers ({subject: teacher id}) and Subject.class_teacher"""
+    Class = apps.get_model('api', 'Class')
+    Subject = apps.get_model('api', 'Subject')
+    User = apps.get_model('api', 'User')
+    TeachingAssignment = apps.get_model('api', 'TeachingAssignment')
+
+    pairs = set(
+        Subject.objects.filter(school_class__isnull=False, class_teacher__isnull=False)
+        .values_list('school_class_id', 'name', 'class_teacher_id')
+    )
+    for class_id, mapping in Class.objects.values_list('pk', 'subject_teachers'):
+        if isinstance(mapping, dict):
+            for subject, teacher_id in mapping.items():
+                if str(teacher_id).isdigit() and subject and len(subject) <= 100:
+                    pairs.add((class_id, subject, int(teacher_id)))
+
+    teachers = set(User.objects.filter(role='teacher').values_list('pk', flat=True))
+    TeachingAssignment.objects.bulk_create(
+        [
+            TeachingAssignment(school_class_id=class_id, subject=subject, teacher_id=teacher_id)
+            for class_id, subject, teacher_id in pairs if teacher_id in teachers
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_marks_generated_percentage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeachingAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('school_class', models.ForeignKey(db_column='class_id', on_delete=django.db.models.deletion.CASCADE, related_name='teaching_assignments', to='api.class')),
+                ('teacher', models.ForeignKey(limit_choices_to={'role': 'teacher'}, on_delete=django.db.models.deletion.CASCADE, related_name='teaching_assignments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'teaching_assignments',
+                'indexes': [models.Index(fields=['teacher', 'school_class'], name='teaching_teacher_class_idx')],
+                'unique_together': {('school_class', 'subject', 'teacher')},
+            },
+        ),
+        migrations.RunPython(copy_subject_teachers, migrations.RunPython.noop),
+    ]
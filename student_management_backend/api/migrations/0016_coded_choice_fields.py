@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:25
+
+import api.fields
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# (model, field, codes) converted from VARCHAR to small integer codes
+CODED_FIELDS = [
+    ('attendance', 'status', {'Present': 1, 'Absent': 2}),
+    ('leave', 'status', {'Pending': 1, 'Approved': 2, 'Rejected': 3}),
+    ('marks', 'exam_type', {'Unit Test 1': 1, 'Unit Test 2': 2, 'Mid Term': 3, 'Unit Test 3': 4, 'Final Exam': 5}),
+    ('user', 'role', {'admin': 1, 'teacher': 2, 'student': 3}),
+]
+
+
+def encode_choices(apps, schema_editor):
+    """Rewrite each string as its code (still as text) so the column type change casts it"""
+    for model_name, field, codes in CODED_FIELDS:
+        model = apps.get_model('api', model_name)
+        by_folded = {value.casefold(): code for value, code in codes.items()}
+        unknown = []
+        for value in model.objects.values_list(field, flat=True).distinct():
+            code = by_folded.get((value or '').strip().casefold())
+            if code is None:
+                unknown.append(value)
+            else:
+                model.objects.filter(**{field: value}).update(**{field: str(code)})
+        if unknown:
+            raise ValueError(f'{model_name}.{field} has values with no code: {unknown!r}')
+
+
+def decode_choices(apps, schema_editor):
+    for model_name, field, codes in CODED_FIELDS:
+        model = apps.get_model('api', model_name)
+        for value, code in codes.items():
+            model.objects.filter(**{field: str(code)}).update(**{field: value})
+
+
+def restore_marked_by(apps, schema_editor):
+    """Reverse only: refill the dropped column from the marking teacher's name"""
+    Attendance = apps.get_model('api', 'Attendance')
+    User = apps.get_model('api', 'User')
+    Attendance.objects.update(marked_by=Subquery(User.objects.filter(pk=OuterRef('teacher_id')).values('name')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_teachingassignment'),
+    ]
+
+    operations = [
+        migrations.RunPython(encode_choices, decode_choices),
+        migrations.AlterField(
+            model_name='attendance',
+            name='status',
+            field=api.fields.CodedChoiceField(choices=[('Present', 'Present'), ('Absent', 'Absent')], codes={'Absent': 2, 'Present': 1}),
+        ),
+        migrations.AlterField(
+            model_name='leave',
+            name='status',
+            field=api.fields.CodedChoiceField(choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')], codes={'Approved': 2, 'Pending': 1, 'Rejected': 3}, default='Pending'),
+        ),
+        migrations.AlterField(
+            model_name='marks',
+            name='exam_type',
+            field=api.fields.CodedChoiceField(choices=[('Unit Test 1', 'Unit Test 1'), ('Unit Test 2', 'Unit Test 2'), ('Mid Term', 'Mid Term'), ('Unit Test 3', 'Unit Test 3'), ('Final Exam', 'Final Exam')], codes={'Final Exam': 5, 'Mid Term': 3, 'Unit Test 1': 1, 'Unit Test 2': 2, 'Unit Test 3': 4}),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=api.fields.CodedChoiceField(choices=[('admin', 'Admin'), ('teacher', 'Teacher'), ('student', 'Student')], codes={'admin': 1, 'student': 3, 'teacher': 2}),
+        ),
+        # The serializers now derive marked_by from the attendance's teacher. Made
+        # nullable first so that unapplying can re-add the column before refilling it
+        migrations.AlterField(
+            model_name='attendance',
+            name='marked_by',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_marked_by),
+        migrations.RemoveField(
+            model_name='attendance',
+            name='marked_by',
+        ),
+    ]
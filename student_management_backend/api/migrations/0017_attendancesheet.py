@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_coded_choice_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSheet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('roster', models.JSONField(default=list)),
+                ('statuses', models.BinaryField(default=bytes)),
+                ('updated_by', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('school_class', models.ForeignKey(db_column='class_id', on_delete=django.db.models.deletion.CASCADE, related_name='attendance_sheets', to='api.class')),
+                ('teacher', models.ForeignKey(limit_choices_to={'role': 'teacher'}, on_delete=django.db.models.deletion.CASCADE, related_name='marked_attendance_sheets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attendance_sheets',
+                'indexes': [models.Index(fields=['date'], name='att_sheet_date_idx')],
+                'unique_together': {('school_class', 'date')},
+            },
+        ),
+    ]
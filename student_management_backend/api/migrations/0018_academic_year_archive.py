@@ -0,0 +1,194 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:35
+
+import api.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, When
+from django.db.models.functions import ExtractYear
+
+ACADEMIC_YEAR_START_MONTH = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6)
+# table -> columns of its unique key, which MySQL requires to include the partition key
+PARTITIONED_TABLES = {
+    'attendances': ['student_id', 'date'],
+    'marks': ['student_id', 'subject', 'exam_type', 'teacher_id'],
+}
+ARCHIVE_TABLES = ['attendances_archive', 'marks_archive']
+
+
+def backfill_academic_years(apps, schema_editor):
+    for model_name, date_field in (('Attendance', 'date'), ('Marks', 'created_at')):
+        apps.get_model('api', model_name).objects.update(academic_year=Case(
+            When(**{f'{date_field}__month__gte': ACADEMIC_YEAR_START_MONTH}, then=ExtractYear(date_field)),
+            default=ExtractYear(date_field) - 1,
+        ))
+
+
+def unique_index_name(cursor, table):
+    cursor.execute(
+        "SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = DATABASE() "
+        "AND table_name = %s AND non_unique = 0 AND index_name <> 'PRIMARY'",
+        [table],
+    )
+    return cursor.fetchone()[0]
+
+
+def partition_tables(apps, schema_editor):
+    """Partition by academic year on MySQL: one partition per year seen so far plus a catch-all"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table, unique_columns in PARTITIONED_TABLES.items():
+            cursor.execute(f'SELECT DISTINCT academic_year FROM {qn(table)}')
+            years = sorted(row[0] for row in cursor.fetchall())
+            index = unique_index_name(cursor, table)
+            columns = ', '.join(qn(column) for column in [*unique_columns, 'academic_year'])
+            schema_editor.execute(
+                f'ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY (id, academic_year), '
+                f'DROP INDEX {qn(index)}, ADD UNIQUE INDEX {qn(index)} ({columns})'
+            )
+            partitions = [f'PARTITION p{year} VALUES LESS THAN ({year + 1})' for year in years]
+            partitions.append('PARTITION p_future VALUES LESS THAN MAXVALUE')
+            schema_editor.execute(
+                f"ALTER TABLE {qn(table)} PARTITION BY RANGE (academic_year) ({', '.join(partitions)})"
+            )
+        for table in ARCHIVE_TABLES:
+            schema_editor.execute(f'ALTER TABLE {qn(table)} ROW_FORMAT=COMPRESSED')
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table, unique_columns in PARTITIONED_TABLES.items():
+            index = unique_index_name(cursor, table)
+            columns = ', '.join(qn(column) for column in unique_columns)
+            schema_editor.execute(f'ALTER TABLE {qn(table)} REMOVE PARTITIONING')
+            schema_editor.execute(
+                f'ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY (id), '
+                f'DROP INDEX {qn(index)}, ADD UNIQUE INDEX {qn(index)} ({columns})'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_attendancesheet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='academic_year',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='marks',
+            name='academic_year',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_academic_years, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attendance',
+            name='academic_year',
+            field=models.PositiveSmallIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='marks',
+            name='academic_year',
+            field=models.PositiveSmallIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_records', to='api.class'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='teacher',
+            field=models.ForeignKey(db_constraint=False, limit_choices_to={'role': 'teacher'}, on_delete=django.db.models.deletion.CASCADE, related_name='marked_attendance', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='marks',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_column='class_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='marks', to='api.class'),
+        ),
+        migrations.AlterField(
+            model_name='marks',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='marks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='marks',
+            name='teacher',
+            field=models.ForeignKey(db_constraint=False, limit_choices_to={'role': 'teacher'}, on_delete=django.db.models.deletion.CASCADE, related_name='marks_given', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='ArchivedYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=64)),
+                ('academic_year', models.PositiveSmallIntegerField()),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archived_academic_years',
+                'unique_together': {('table', 'academic_year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', api.fields.CodedChoiceField(choices=[('Present', 'Present'), ('Absent', 'Absent')], codes={'Absent': 2, 'Present': 1})),
+                ('class_name', models.CharField(max_length=10)),
+                ('division', models.CharField(blank=True, max_length=1, null=True)),
+                ('academic_year', models.PositiveSmallIntegerField()),
+                ('updated_by', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('school_class', models.ForeignKey(db_column='class_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.class')),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('teacher', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attendances_archive',
+                'indexes': [models.Index(fields=['academic_year', 'date'], name='att_archive_year_date_idx'), models.Index(fields=['academic_year', 'student'], name='att_archive_year_student_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MarksArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('subject', models.CharField(max_length=100)),
+                ('class_name', models.CharField(max_length=10)),
+                ('division', models.CharField(blank=True, max_length=1, null=True)),
+                ('academic_year', models.PositiveSmallIntegerField()),
+                ('exam_type', api.fields.CodedChoiceField(choices=[('Unit Test 1', 'Unit Test 1'), ('Unit Test 2', 'Unit Test 2'), ('Mid Term', 'Mid Term'), ('Unit Test 3', 'Unit Test 3'), ('Final Exam', 'Final Exam')], codes={'Final Exam': 5, 'Mid Term': 3, 'Unit Test 1': 1, 'Unit Test 2': 2, 'Unit Test 3': 4})),
+                ('marks_obtained', models.FloatField()),
+                ('total_marks', models.FloatField()),
+                ('percentage', models.FloatField(null=True)),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('school_class', models.ForeignKey(db_column='class_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.class')),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('teacher', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'marks_archive',
+                'indexes': [models.Index(fields=['academic_year', 'student'], name='marks_archive_year_student_idx'), models.Index(fields=['academic_year', 'class_name', 'division'], name='marks_archive_year_class_idx')],
+            },
+        ),
+        # Runs last: it needs the foreign keys dropped and the archive tables created
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
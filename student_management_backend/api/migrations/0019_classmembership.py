@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_academic_year_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.PositiveSmallIntegerField()),
+                ('class_number', models.IntegerField()),
+                ('division', models.CharField(max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('class_teacher', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('school_class', models.ForeignKey(db_column='class_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='memberships', to='api.class')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'class_memberships',
+                'indexes': [models.Index(fields=['school_class', 'academic_year'], name='membership_class_year_idx')],
+                'unique_together': {('student', 'academic_year')},
+            },
+        ),
+    ]
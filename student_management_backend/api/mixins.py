@@ -0,0 +1,171 @@
+import hashlib
+from functools import partial
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .query_cache import VERSIONED_MODELS, cached_get, cached_queryset, query_cache, table_versions
+
+
+def eager_load(queryset, serializer):
+    """Join the relations ``serializer`` reads and load only the columns it renders.
+
+    Dotted sources such as ``student.name`` become ``select_related('student')``
+    plus ``only('student__name')``. If any field reads something that is not a
+    model column (a method or property) all local columns are kept.
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    model = queryset.model
+    related, columns, restrict = set(), set(), True
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        parts = field.source.split('.')
+        if len(parts) > 1:
+            related.add('__'.join(parts[:-1]))
+            columns.add('__'.join(parts))
+            continue
+        try:
+            model_field = model._meta.get_field(parts[0])
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is None or not model_field.concrete or model_field.many_to_many:
+            restrict = False
+            continue
+        columns.add(parts[0])
+
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    if restrict and columns:
+        queryset = queryset.only(*sorted(columns))
+    return queryset
+
+
+class EagerLoadingMixin:
+    """Apply ``eager_load`` to the querysets a ViewSet reads for GET requests"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS:
+            queryset = eager_load(queryset, self.get_serializer())
+        return queryset
+
+
+class QueryCacheMixin:
+    """Serve list and detail GETs of reference data through the query cache"""
+
+    def list(self, request, *args, **kwargs):
+        queryset = cached_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    def get_object(self):
+        if self.request.method not in SAFE_METHODS:
+            return super().get_object()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            obj = cached_get(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class NotModified(Exception):
+    """Raised from ``initial`` to answer a conditional GET with 304"""
+
+
+class ConditionalGetMixin:
+    """Answer list and detail GETs with 304 when the client's ETag is current.
+
+    ViewSets whose responses read only reference data name those models in
+    ``versioned_models``; their ETag hashes the tables' query cache versions,
+    so a 304 costs no query. Other ViewSets are validated by one aggregate over
+    the rows they would serve (``COUNT`` and ``MAX(updated_at)``, which also
+    gives ``Last-Modified``) plus the versions of the reference tables they
+    join. Both are checked before the action runs. Responses with no such
+    validator are ETagged from the rendered page, so a 304 saves the transfer.
+    """
+    conditional_actions = ('list', 'retrieve')
+    versioned_models = ()
+
+    def is_conditional(self, request):
+        return request.method == 'GET' and self.action in self.conditional_actions
+
+    def validator_queryset(self, queryset):
+        """The rows of the filtered ``queryset`` a GET serves, or None to ETag the rendered page instead"""
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, ValidationError):
+                return None
+        return queryset
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if not self.is_conditional(request):
+            return
+        if self.versioned_models:
+            if query_cache() is None:
+                return
+            state = sorted(table_versions([model._meta.db_table for model in self.versioned_models]).items())
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            joined, served = joined_versioned_models(queryset), self.validator_queryset(queryset)
+            if served is None or (joined and query_cache() is None):
+                return
+            rows = served.aggregate(count=Count('pk'), last=Max('updated_at'))
+            versions = table_versions([model._meta.db_table for model in joined]) if joined else {}
+            state = (sorted(versions.items()), rows['count'], rows['last'] and rows['last'].isoformat())
+            # Versions are the time_ns of the last write, so a joined rename moves Last-Modified too
+            changed = [version / 1e9 for version in versions.values()]
+            if rows['last'] is not None:
+                changed.append(rows['last'].timestamp())
+            self.last_modified = int(max(changed)) if changed else None
+        raw = f'{request.get_full_path()}|{request.accepted_media_type}|{state!r}'
+        self.etag = f'W/"{hashlib.sha1(raw.encode()).hexdigest()}"'
+        if get_conditional_response(request._request, etag=self.etag, last_modified=self.last_modified) is not None:
+            raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return HttpResponseNotModified()
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            if self.last_modified is not None:
+                response.headers.setdefault('Last-Modified', http_date(self.last_modified))
+        elif isinstance(response, Response) and response.status_code == 200 and self.is_conditional(request):
+            response.add_post_render_callback(partial(rendered_etag, request._request))
+        return response
+
+
+def joined_versioned_models(queryset):
+    """The reference data models ``queryset`` joins with ``select_related``"""
+    joined = queryset.query.select_related
+    if not isinstance(joined, dict):
+        return []
+    models = {queryset.model._meta.get_field(name).related_model for name in joined}
+    return sorted((model for model in models if model in VERSIONED_MODELS), key=lambda model: model._meta.label)
+
+
+def rendered_etag(request, response):
+    """Post-render callback: ETag the body and answer 304 if the client already has it"""
+    etag = f'W/"{hashlib.sha1(response.content).hexdigest()}"'
+    response.headers.setdefault('ETag', etag)
+    return get_conditional_response(request, etag=etag, response=response)
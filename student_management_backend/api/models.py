@@ -1,7 +1,34 @@
+import re
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .fields import CodedChoiceField
+
+CLASS_NAME_RE = re.compile(r"^\s*(\d+)\s*([A-Za-z]?)\s*$")
+
+
+def parse_class_name(class_name, division=None):
+    """``(class_number, division)`` for "9" + "A" or "9A", or None if either part is missing"""
+    match = CLASS_NAME_RE.match(str(class_name)) if class_name else None
+    if not match:
+        return None
+    division = (division or match.group(2)).strip().upper()
+    if not division:
+        return None
+    return int(match.group(1)), division
+
+
+ACADEMIC_YEAR_START_MONTH = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6)
+
+
+def academic_year_of(day):
+    """Calendar year the academic year containing ``day`` starts in (June 2025 to May 2026 is 2025)"""
+    return day.year if day.month >= ACADEMIC_YEAR_START_MONTH else day.year - 1
+
+
 # User Manager
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -39,12 +66,21 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
-    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    role = CodedChoiceField(choices=ROLE_CHOICES, codes={'admin': 1, 'teacher': 2, 'student': 3})
     phone = models.CharField(max_length=15, null=True, blank=True)
     
     # For students
     className = models.CharField(max_length=10, null=True, blank=True)
     division = models.CharField(max_length=1, null=True, blank=True)
+    # Resolved from className/division on save; the strings stay for API compatibility
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='students',
+        db_column='class_id'
+    )
     
     # For teachers
     subject = models.CharField(max_length=100, null=True, blank=True)
@@ -63,6 +99,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     class Meta:
         db_table = 'users'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='users_created_id_idx'),
+            models.Index(fields=['role', 'className', 'division'], name='users_role_class_div_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.role})"
@@ -108,34 +148,114 @@ class Class(models.Model):
 class Attendance(models.Model):
     STATUS_CHOICES = [('Present', 'Present'), ('Absent', 'Absent')]
     
+    # No database foreign keys: MySQL cannot partition a table that has them
     student = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='attendance_records',
         limit_choices_to={'role': 'student'}
     )
     teacher = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='marked_attendance',
         limit_choices_to={'role': 'teacher'}
     )
     date = models.DateField()
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    status = CodedChoiceField(choices=STATUS_CHOICES, codes={'Present': 1, 'Absent': 2})
     class_name = models.CharField(max_length=10)
     division = models.CharField(max_length=1, null=True, blank=True)
-    marked_by = models.CharField(max_length=255)
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='attendance_records',
+        db_column='class_id'
+    )
+    # Partition key on MySQL, set from the date on save
+    academic_year = models.PositiveSmallIntegerField(editable=False)
     updated_by = models.CharField(max_length=255, null=True, blank=True)  # Track who last edited
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'attendances'
+        indexes = [
+            models.Index(fields=['date', 'id'], name='attendances_date_id_idx'),
+            models.Index(fields=['class_name', 'division', 'date'], name='att_class_div_date_idx'),
+            models.Index(fields=['school_class', 'date'], name='att_school_class_date_idx'),
+        ]
         unique_together = [['student', 'date']]
     
     def __str__(self):
         return f"{self.student.name} - {self.date} - {self.status}"
 
+
+# Attendance Sheet Model
+class AttendanceSheet(models.Model):
+    """One class's attendance for one day, stored as a single row.
+
+    ``roster`` lists student ids and ``statuses`` packs a 2-bit code per roster
+    slot (0 for unmarked, else ``STATUS_CODES``), four students to a byte.
+    Slots are only ever appended, so a slot keeps naming the same student.
+    """
+    STATUS_CODES = {'Present': 1, 'Absent': 2}
+    
+    school_class = models.ForeignKey(
+        Class,
+        on_delete=models.CASCADE,
+        related_name='attendance_sheets',
+        db_column='class_id'
+    )
+    date = models.DateField()
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='marked_attendance_sheets',
+        limit_choices_to={'role': 'teacher'}
+    )
+    roster = models.JSONField(default=list)
+    statuses = models.BinaryField(default=bytes)
+    updated_by = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_sheets'
+        indexes = [
+            models.Index(fields=['date'], name='att_sheet_date_idx'),
+        ]
+        unique_together = [['school_class', 'date']]
+    
+    def __str__(self):
+        return f"{self.school_class_id} - {self.date}"
+    
+    def marked_slots(self):
+        """``(slot, student id, status)`` for every marked roster slot"""
+        packed = bytes(self.statuses or b'')
+        statuses = {code: status for status, code in self.STATUS_CODES.items()}
+        for slot, student_id in enumerate(self.roster):
+            code = packed[slot // 4] >> (slot % 4 * 2) & 3 if slot // 4 < len(packed) else 0
+            if code:
+                yield slot, student_id, statuses[code]
+    
+    def entries(self):
+        """``{student id: status}`` of every marked student"""
+        return {student_id: status for _, student_id, status in self.marked_slots()}
+    
+    def set_entries(self, entries):
+        """Repack from ``{student id: status}``; students left out become unmarked"""
+        known = set(self.roster)
+        roster = self.roster + [student_id for student_id in entries if student_id not in known]
+        packed = bytearray((len(roster) + 3) // 4)
+        for slot, student_id in enumerate(roster):
+            packed[slot // 4] |= self.STATUS_CODES.get(entries.get(student_id), 0) << (slot % 4 * 2)
+        self.roster, self.statuses = roster, bytes(packed)
+
 # Leave Model
 class Leave(models.Model):
     STATUS_CHOICES = [
@@ -154,9 +274,9 @@ class Leave(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     details = models.TextField(blank=True, null=True)
-    status = models.CharField(
-        max_length=20,
+    status = CodedChoiceField(
         choices=STATUS_CHOICES,
+        codes={'Pending': 1, 'Approved': 2, 'Rejected': 3},
         default='Pending'
     )
     created_at = models.DateTimeField(auto_now_add=True)
@@ -164,6 +284,10 @@ class Leave(models.Model):
     
     class Meta:
         db_table = 'leaves'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='leaves_created_id_idx'),
+            models.Index(fields=['status', 'created_at'], name='leaves_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.reason} - {self.status}"
@@ -172,6 +296,14 @@ class Leave(models.Model):
 class Subject(models.Model):
     name = models.CharField(max_length=100)
     class_name = models.CharField(max_length=10)
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='class_subjects',
+        db_column='class_id'
+    )
     class_teacher = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -180,9 +312,13 @@ class Subject(models.Model):
         related_name='taught_subjects',
         limit_choices_to={'role': 'teacher'}
     )
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'subjects'
+        indexes = [
+            models.Index(fields=['class_name'], name='subjects_class_name_idx'),
+        ]
         unique_together = [['name', 'class_name']]
     
     def __str__(self):
@@ -198,12 +334,24 @@ class Event(models.Model):
     audience = models.CharField(max_length=10, choices=AUDIENCE_CHOICES, default='ALL')
     class_name = models.CharField(max_length=10, null=True, blank=True)
     division = models.CharField(max_length=1, null=True, blank=True)
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='events',
+        db_column='class_id'
+    )
     created_by = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'events'
+        indexes = [
+            models.Index(fields=['audience', 'date'], name='events_audience_date_idx'),
+            models.Index(fields=['class_name', 'date'], name='events_class_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.date}"
@@ -218,43 +366,69 @@ class Marks(models.Model):
         ('Final Exam', 'Final Exam'),
     ]
     
+    # No database foreign keys: MySQL cannot partition a table that has them
     student = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='marks',
         limit_choices_to={'role': 'student'}
     )
     teacher = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='marks_given',
         limit_choices_to={'role': 'teacher'}
     )
     subject = models.CharField(max_length=100)
     class_name = models.CharField(max_length=10)
     division = models.CharField(max_length=1, null=True, blank=True)
-    exam_type = models.CharField(max_length=50, choices=EXAM_TYPES)
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='marks',
+        db_column='class_id'
+    )
+    # Partition key on MySQL, set from the creation date on first save
+    academic_year = models.PositiveSmallIntegerField(editable=False)
+    exam_type = CodedChoiceField(
+        choices=EXAM_TYPES,
+        codes={'Unit Test 1': 1, 'Unit Test 2': 2, 'Mid Term': 3, 'Unit Test 3': 4, 'Final Exam': 5}
+    )
     marks_obtained = models.FloatField(
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
     total_marks = models.FloatField(default=100)
-    percentage = models.FloatField(null=True, blank=True)
+    # Computed and stored by the database, so bulk writes and update() keep it right
+    percentage = models.GeneratedField(
+        expression=models.Case(
+            models.When(total_marks__gt=0, then=models.F('marks_obtained') / models.F('total_marks') * 100),
+            default=None,
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+        null=True
+    )
     remarks = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'marks'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='marks_created_id_idx'),
+            models.Index(fields=['class_name', 'division', 'subject', 'exam_type'], name='marks_class_div_subj_idx'),
+            models.Index(fields=['subject', 'exam_type'], name='marks_subject_exam_idx'),
+            models.Index(fields=['school_class', 'subject', 'exam_type'], name='marks_school_class_subj_idx'),
+        ]
         unique_together = [['student', 'subject', 'exam_type', 'teacher']]
     
     def __str__(self):
         return f"{self.student.name} - {self.subject} - {self.exam_type}: {self.marks_obtained}/{self.total_marks}"
-    
-    def save(self, *args, **kwargs):
-        # Calculate percentage
-        if self.total_marks > 0:
-            self.percentage = (self.marks_obtained / self.total_marks) * 100
-        super().save(*args, **kwargs)
 
 # Assignment Model
 class Assignment(models.Model):
@@ -263,6 +437,14 @@ class Assignment(models.Model):
     subject = models.CharField(max_length=100)
     class_name = models.CharField(max_length=10)
     division = models.CharField(max_length=1, null=True, blank=True)
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='assignments',
+        db_column='class_id'
+    )
     due_date = models.DateField()
     teacher = models.ForeignKey(
         User, 
@@ -276,6 +458,10 @@ class Assignment(models.Model):
     class Meta:
         db_table = 'assignments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['class_name', 'division', 'subject'], name='assign_class_div_subj_idx'),
+            models.Index(fields=['class_name', 'division', 'due_date'], name='assign_class_div_due_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.subject} ({self.class_name}{self.division})"
@@ -288,6 +474,14 @@ class Resource(models.Model):
     subject = models.CharField(max_length=100)
     class_name = models.CharField(max_length=10)
     division = models.CharField(max_length=1, null=True, blank=True)
+    school_class = models.ForeignKey(
+        'Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='resources',
+        db_column='class_id'
+    )
     teacher = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -300,7 +494,222 @@ class Resource(models.Model):
     class Meta:
         db_table = 'resources'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['class_name', 'division', 'subject', 'created_at'], name='res_class_div_subj_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.subject} ({self.class_name}{self.division})"
 
+
+# Teaching Assignment Model
+class TeachingAssignment(models.Model):
+    """Who teaches which subject in which class.
+
+    Derived from ``Class.subject_teachers`` and the classes' ``Subject`` rows so
+    that teacher-scoped lookups are an indexed join rather than a JSON scan.
+    """
+    school_class = models.ForeignKey(
+        Class,
+        on_delete=models.CASCADE,
+        related_name='teaching_assignments',
+        db_column='class_id'
+    )
+    subject = models.CharField(max_length=100)
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='teaching_assignments',
+        limit_choices_to={'role': 'teacher'}
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'teaching_assignments'
+        indexes = [
+            models.Index(fields=['teacher', 'school_class'], name='teaching_teacher_class_idx'),
+        ]
+        unique_together = [['school_class', 'subject', 'teacher']]
+    
+    def __str__(self):
+        return f"{self.teacher_id} teaches {self.subject} in {self.school_class_id}"
+
+
+# Class Membership Model
+class ClassMembership(models.Model):
+    """The class a student was in during a closed academic year, written by the year-end rollover"""
+    academic_year = models.PositiveSmallIntegerField()
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='class_memberships'
+    )
+    school_class = models.ForeignKey(
+        Class,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='memberships',
+        db_column='class_id'
+    )
+    class_number = models.IntegerField()
+    division = models.CharField(max_length=1)
+    class_teacher = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'class_memberships'
+        indexes = [
+            models.Index(fields=['school_class', 'academic_year'], name='membership_class_year_idx'),
+        ]
+        unique_together = [['student', 'academic_year']]
+    
+    def __str__(self):
+        return f"{self.student_id} in {self.class_number}{self.division} ({self.academic_year})"
+
+
+# Dashboard Snapshot Model
+class DashboardSnapshot(models.Model):
+    """Stored class teacher dashboard payload, flagged dirty by writes"""
+    school_class = models.OneToOneField(
+        Class,
+        on_delete=models.CASCADE,
+        related_name='dashboard_snapshot'
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    snapshot_date = models.DateField()
+    is_dirty = models.BooleanField(default=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'dashboard_snapshots'
+    
+    def __str__(self):
+        return f"Dashboard {self.school_class} ({self.snapshot_date})"
+
+
+# Attendance Daily Roll-up Model
+class AttendanceRollup(models.Model):
+    """Per-class daily attendance counts kept in step with attendance writes"""
+    date = models.DateField()
+    class_name = models.CharField(max_length=10)
+    division = models.CharField(max_length=1, blank=True, default='')
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'attendance_daily_rollups'
+        unique_together = [['date', 'class_name', 'division']]
+    
+    def __str__(self):
+        return f"{self.class_name}{self.division} - {self.date}: {self.present}/{self.total}"
+
+
+# School Counters Model
+class SchoolCounters(models.Model):
+    """Single-row school-wide totals kept current with F() updates on write"""
+    students = models.IntegerField(default=0)
+    teachers = models.IntegerField(default=0)
+    classes = models.IntegerField(default=0)
+    attendance_date = models.DateField(null=True, blank=True)
+    present_today = models.IntegerField(default=0)
+    total_today = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'school_counters'
+    
+    def __str__(self):
+        return f"{self.students} students, {self.teachers} teachers, {self.classes} classes"
+
+
+# Archive Models
+class AttendanceArchive(models.Model):
+    """Attendance rows of archived academic years, moved out by ``archive_academic_years``"""
+    STATUS_CHOICES = Attendance.STATUS_CHOICES
+    
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    teacher = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    date = models.DateField()
+    status = CodedChoiceField(choices=STATUS_CHOICES, codes={'Present': 1, 'Absent': 2})
+    class_name = models.CharField(max_length=10)
+    division = models.CharField(max_length=1, null=True, blank=True)
+    school_class = models.ForeignKey(
+        Class,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        db_column='class_id'
+    )
+    academic_year = models.PositiveSmallIntegerField()
+    updated_by = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'attendances_archive'
+        indexes = [
+            models.Index(fields=['academic_year', 'date'], name='att_archive_year_date_idx'),
+            models.Index(fields=['academic_year', 'student'], name='att_archive_year_student_idx'),
+        ]
+
+
+class MarksArchive(models.Model):
+    """Marks of archived academic years, moved out by ``archive_academic_years``"""
+    EXAM_TYPES = Marks.EXAM_TYPES
+    
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    teacher = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    subject = models.CharField(max_length=100)
+    class_name = models.CharField(max_length=10)
+    division = models.CharField(max_length=1, null=True, blank=True)
+    school_class = models.ForeignKey(
+        Class,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        db_column='class_id'
+    )
+    academic_year = models.PositiveSmallIntegerField()
+    exam_type = CodedChoiceField(
+        choices=EXAM_TYPES,
+        codes={'Unit Test 1': 1, 'Unit Test 2': 2, 'Mid Term': 3, 'Unit Test 3': 4, 'Final Exam': 5}
+    )
+    marks_obtained = models.FloatField()
+    total_marks = models.FloatField()
+    # Copied from the generated column of the live table
+    percentage = models.FloatField(null=True)
+    remarks = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'marks_archive'
+        indexes = [
+            models.Index(fields=['academic_year', 'student'], name='marks_archive_year_student_idx'),
+            models.Index(fields=['academic_year', 'class_name', 'division'], name='marks_archive_year_class_idx'),
+        ]
+
+
+class ArchivedYear(models.Model):
+    """An academic year whose rows of ``table`` live in its archive table"""
+    table = models.CharField(max_length=64)
+    academic_year = models.PositiveSmallIntegerField()
+    rows = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'archived_academic_years'
+        unique_together = [['table', 'academic_year']]
+    
+    def __str__(self):
+        return f"{self.table} {self.academic_year} ({self.rows} rows)"
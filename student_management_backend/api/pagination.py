@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .archive import merged_keys, merged_rows
+from .attendance_sheets import sheet_page
+
+
+class KeysetPagination(PageNumberPagination):
+    """Page numbers by default, keyset (cursor) pages on request.
+
+    Clients opt in with ``?pagination=cursor`` and then follow the ``next``
+    links, which carry an opaque ``cursor`` holding the last ``(key, id)``
+    seen. Each page is a single indexed range read newest-first, with no
+    ``COUNT(*)`` and no ``OFFSET``, so walking deep into history costs the
+    same per page as the first one.
+    """
+    key_field = 'created_at'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def use_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Plain lists have no ordered key and page by number
+        self.keyset = self.use_keyset(request) and isinstance(queryset, QuerySet)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = self.after_cursor(queryset.order_by(f'-{self.key_field}', '-pk'), request)
+
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(getattr(last, self.key_field), last.pk)
+        return rows
+
+    def paginate_merged(self, live, archived, request, view=None):
+        """Page over the rows of ``live`` and of ``archived`` (an archive table) as one list.
+
+        The two are merged by a UNION of their ``(key, id)`` columns, ordered
+        and sliced in SQL, so a page reads only its own rows from either
+        table. Keyset and page number pages both work.
+        """
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            keys = super().paginate_queryset(merged_keys(live, archived, self.key_field), request, view)
+            return merged_rows(keys, live, archived)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        keys = list(merged_keys(
+            self.after_cursor(live, request), self.after_cursor(archived, request), self.key_field
+        )[:page_size + 1])
+        self.next_cursor = None
+        if len(keys) > page_size:
+            keys = keys[:page_size]
+            self.next_cursor = self.encode_cursor(*keys[-1][:2])
+        return merged_rows(keys, live, archived)
+
+    def after_cursor(self, queryset, request):
+        """``queryset`` narrowed to the rows after the request's cursor, if it has one"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return queryset
+        key_value, pk = self.decode_cursor(encoded, queryset.model)
+        return queryset.filter(
+            Q(**{f'{self.key_field}__lt': key_value}) | Q(**{self.key_field: key_value, 'pk__lt': pk})
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def encode_cursor(self, key_value, pk):
+        raw = json.dumps([key_value.isoformat(), pk])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, encoded, model):
+        try:
+            key_value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            key_value = model._meta.get_field(self.key_field).to_python(key_value)
+            pk = int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        # The key columns are NOT NULL; a null key cannot be compared against
+        if key_value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return key_value, pk
+
+
+class DateKeysetPagination(KeysetPagination):
+    key_field = 'date'
+
+    def paginate_sheets(self, sheets, request, student_id=None):
+        """Keyset page of the attendance rows stored in ``sheets``.
+
+        Sheet rows always page by cursor: counting them or skipping to a page
+        number would unpack every sheet. The cursor holds the date and row id
+        of the last row served.
+        """
+        if self.page_query_param in request.query_params:
+            raise ParseError('Attendance stored as sheets pages by cursor; follow the next link')
+        self.request, self.keyset = request, True
+        encoded = request.query_params.get(self.cursor_query_param)
+        after = self.decode_cursor(encoded, sheets.model) if encoded else None
+        rows, last = sheet_page(sheets, self.get_page_size(request), student_id, after)
+        self.next_cursor = last and self.encode_cursor(*last)
+        return rows
@@ -0,0 +1,104 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import transaction
+
+from .models import User, Class, Subject, Event, TeachingAssignment
+
+QUERY_CACHE_TIMEOUT = getattr(settings, 'QUERY_CACHE_TIMEOUT', 300)
+
+# Reference data: read on most requests, written a few times a term.
+# A cached query may only read these tables.
+VERSIONED_MODELS = [User, Class, Subject, Event, TeachingAssignment]
+VERSIONED_TABLES = {model._meta.db_table for model in VERSIONED_MODELS}
+
+
+def query_cache():
+    """The cache backing query results and versions, or None when ``QUERY_CACHE_ALIAS`` is unset"""
+    alias = getattr(settings, 'QUERY_CACHE_ALIAS', 'query')
+    return caches[alias] if alias else None
+
+
+def version_key(table):
+    return f'version:{table}'
+
+
+def new_version():
+    # Never reused, so a version lost to eviction cannot revive old entries
+    return time.time_ns()
+
+
+def table_versions(tables):
+    """``{table: version}``, starting a version for tables that have none"""
+    cache = query_cache()
+    keys = {version_key(table): table for table in tables}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, new_version(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_versions(*models):
+    cache = query_cache()
+    if cache is not None:
+        cache.set_many({version_key(model._meta.db_table): new_version() for model in models}, timeout=None)
+
+
+def invalidate(*models):
+    """Orphan every cached result that read ``models``.
+
+    Bumped at once, so the writer's own later reads miss, and again on commit,
+    so a result another process cached from pre-commit data is orphaned too.
+    """
+    bump_versions(*models)
+    transaction.on_commit(lambda: bump_versions(*models))
+
+
+def query_tables(queryset):
+    """``(sql, params, tables)`` the queryset runs, tables including select_related joins"""
+    query = queryset.query.chain()
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    return sql, params, {join.table_name for join in query.alias_map.values()}
+
+
+def cached_queryset(queryset, timeout=None):
+    """Evaluate ``queryset`` through the query cache; returns a list.
+
+    The key hashes the compiled SQL and parameters with the versions of every
+    table the query reads, so a save anywhere in those tables changes the key.
+    Queries reading unversioned tables, or prefetching, run uncached.
+    """
+    cache = query_cache()
+    if cache is None or queryset._prefetch_related_lookups:
+        return list(queryset)
+    try:
+        sql, params, tables = query_tables(queryset)
+    except EmptyResultSet:
+        return []
+    if not tables <= VERSIONED_TABLES:
+        return list(queryset)
+
+    versions = sorted(table_versions(tables).items())
+    raw = f'{queryset.db}|{queryset._iterable_class.__name__}|{sql}|{params!r}|{versions!r}'
+    key = 'rows:' + hashlib.sha1(raw.encode()).hexdigest()
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(queryset)
+        cache.set(key, rows, QUERY_CACHE_TIMEOUT if timeout is None else timeout)
+    return rows
+
+
+def cached_get(queryset, **lookups):
+    """``queryset.get(**lookups)`` through the query cache"""
+    rows = cached_queryset(queryset.filter(**lookups)[:2])
+    if not rows:
+        raise queryset.model.DoesNotExist(f'{queryset.model._meta.object_name} matching query does not exist.')
+    if len(rows) > 1:
+        raise queryset.model.MultipleObjectsReturned(
+            f'get() returned more than one {queryset.model._meta.object_name}'
+        )
+    return rows[0]
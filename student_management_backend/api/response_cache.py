@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import re
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from .query_cache import QUERY_CACHE_TIMEOUT, query_cache, table_versions
+
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', QUERY_CACHE_TIMEOUT)
+# Smaller bodies are not worth a gzip copy
+GZIP_MIN_LENGTH = 200
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+CACHED_FORMATS = ('json', 'msgpack')
+
+
+def response_key(request, tables, daily):
+    """Key over the absolute path, the sorted query params, the media type and the table versions"""
+    params = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+    versions = sorted(table_versions(tables).items())
+    raw = (
+        f'{request.build_absolute_uri(request.path)}|{params!r}|{request.accepted_media_type}|{versions!r}'
+        f"|{date.today() if daily else ''}"
+    )
+    return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def rendered_response(request, content, compressed):
+    """Response for the stored bytes, gzip-encoded when the client accepts it"""
+    vary = compressed is not None
+    if vary and ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = HttpResponse(compressed, content_type=request.accepted_media_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(content, content_type=request.accepted_media_type)
+    if vary:
+        response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def cache_response(*models, daily=False):
+    """Serve a ViewSet GET action's rendered bytes, plus a gzip copy, from the query cache.
+
+    The key covers the path, the query params and the versions of ``models``,
+    the tables the response is built from, so any write to them is a miss.
+    ``daily`` responses also expire at midnight. A hit runs no queries, no
+    serializer and no renderer. JSON and MessagePack are cached; other
+    formats (CSV exports) and non-200 responses pass through.
+    """
+    tables = [model._meta.db_table for model in models]
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            cache = query_cache()
+            renderer = request.accepted_renderer
+            if cache is None or request.method != 'GET' or renderer.format not in CACHED_FORMATS:
+                return handler(self, request, *args, **kwargs)
+
+            key = response_key(request, tables, daily)
+            entry = cache.get(key)
+            if entry is None:
+                response = handler(self, request, *args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200 or response.exception:
+                    return response
+                content = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+                compressed = gzip.compress(content) if len(content) >= GZIP_MIN_LENGTH else None
+                entry = (content, compressed)
+                cache.set(key, entry, RESPONSE_CACHE_TIMEOUT)
+            return rendered_response(request, *entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,158 @@
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, IntegerField, Value, When
+from django.utils import timezone
+
+from .authentication import user_cache
+from .dashboards import mark_class_dashboards_dirty
+from .models import User, Class, ClassMembership
+from .query_cache import invalidate
+from .rollups import refresh_students_counts
+
+FINAL_CLASS = 10
+TEACHER_MODES = ['keep', 'follow', 'clear']
+
+
+def _column(model, field_name):
+    return connection.ops.quote_name(model._meta.get_field(field_name).column)
+
+
+def snapshot_memberships(year):
+    """Record the class of every enrolled student for ``year`` with one INSERT ... SELECT; returns rows"""
+    qn = connection.ops.quote_name
+    columns = ', '.join(
+        _column(ClassMembership, name)
+        for name in ('academic_year', 'student', 'school_class', 'class_number', 'division', 'class_teacher',
+                     'created_at')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(ClassMembership._meta.db_table)} ({columns}) '
+            f"SELECT %s, u.id, c.id, c.{_column(Class, 'class_number')}, c.{_column(Class, 'division')}, "
+            f"c.{_column(Class, 'class_teacher')}, %s "
+            f'FROM {qn(User._meta.db_table)} u '
+            f"JOIN {qn(Class._meta.db_table)} c ON c.id = u.{_column(User, 'school_class')} "
+            f"WHERE u.{_column(User, 'role')} = %s",
+            [year, connection.ops.adapt_datetimefield_value(timezone.now()),
+             User._meta.get_field('role').get_prep_value('student')],
+        )
+        return cursor.rowcount
+
+
+def next_class_teachers(classes, final_class, mode, assignments=None):
+    """``{class pk: teacher id or None}`` for the new year.
+
+    'keep' leaves teachers with their class, 'clear' unassigns everyone and
+    'follow' moves each teacher up with their students, the final-year
+    teachers taking the lowest class of their division. ``assignments``
+    (``{(class_number, division): teacher id}``) override the result.
+    """
+    if mode == 'keep':
+        teachers = {class_obj.pk: class_obj.class_teacher_id for class_obj in classes.values()}
+    else:
+        teachers = {class_obj.pk: None for class_obj in classes.values()}
+    if mode == 'follow':
+        entry = {}
+        for number, division in classes:
+            entry[division] = min(entry.get(division, number), number)
+        for (number, division), class_obj in classes.items():
+            target = (number + 1, division) if number < final_class else (entry[division], division)
+            if class_obj.class_teacher_id and target in classes:
+                teachers[classes[target].pk] = class_obj.class_teacher_id
+    for key, teacher_id in (assignments or {}).items():
+        if key not in classes:
+            raise ValueError(f'Class {key[0]}{key[1]} does not exist')
+        teachers[classes[key].pk] = teacher_id
+    return teachers
+
+
+def _assign_class_teachers(classes, teachers):
+    """Write ``{class pk: teacher id}`` in two UPDATEs; returns the number of classes changed"""
+    current = {class_obj.pk: class_obj.class_teacher_id for class_obj in classes.values()}
+    changed = {pk: teacher_id for pk, teacher_id in teachers.items() if current.get(pk) != teacher_id}
+    if not changed:
+        return 0
+    now = timezone.now()
+    # class_teacher is one-to-one: free every moving teacher before placing any
+    Class.objects.filter(pk__in=changed).update(class_teacher=None, class_teacher_name=None, updated_at=now)
+    assigned = {pk: teacher_id for pk, teacher_id in changed.items() if teacher_id}
+    if assigned:
+        names = dict(User.objects.filter(pk__in=assigned.values()).values_list('pk', 'name'))
+        Class.objects.filter(pk__in=assigned).update(
+            class_teacher_id=Case(
+                *[When(pk=pk, then=Value(teacher_id)) for pk, teacher_id in assigned.items()],
+                output_field=IntegerField(),
+            ),
+            class_teacher_name=Case(
+                *[When(pk=pk, then=Value(names.get(teacher_id))) for pk, teacher_id in assigned.items()],
+                output_field=CharField(),
+            ),
+            updated_at=now,
+        )
+    return len(changed)
+
+
+def rollover_academic_year(year, final_class=FINAL_CLASS, teachers='keep', assignments=None):
+    """Close academic ``year``: snapshot class membership, graduate the final class and promote the rest.
+
+    Runs in one transaction of set-based statements: one INSERT ... SELECT for
+    the snapshot and one UPDATE per class for the students, so the cost grows
+    with the number of classes, not students. Promotion keeps the division
+    (9A to 10A), creating missing classes. Graduates are unenrolled and
+    deactivated. These updates skip the model signals, so students_count, the
+    dashboards and the cached users are refreshed here. Returns a summary dict.
+    """
+    if teachers not in TEACHER_MODES:
+        raise ValueError(f'teachers must be one of {", ".join(TEACHER_MODES)}')
+    now = timezone.now()
+    with transaction.atomic():
+        if ClassMembership.objects.filter(academic_year=year).exists():
+            raise ValueError(f'Academic year {year} has already been rolled over')
+        classes = {
+            (class_obj.class_number, class_obj.division): class_obj
+            for class_obj in Class.objects.select_for_update().order_by('class_number', 'division')
+        }
+        enrolled = dict(
+            User.objects.filter(role='student', school_class__isnull=False)
+            .values_list('school_class').annotate(n=Count('pk')).order_by()
+        )
+        moved = list(User.objects.filter(role='student', school_class__isnull=False).values_list('pk', flat=True))
+        snapshot = snapshot_memberships(year)
+
+        final_ids = [c.pk for (number, _), c in classes.items() if number == final_class]
+        graduated = User.objects.filter(role='student', school_class_id__in=final_ids).update(
+            school_class=None, className=None, division=None, is_active=False, updated_at=now
+        )
+
+        created, promoted = [], 0
+        # Highest class first, so every target class has just been emptied
+        for number, division in sorted(classes, reverse=True):
+            source = classes[(number, division)]
+            if number >= final_class or not enrolled.get(source.pk):
+                continue
+            target = classes.get((number + 1, division))
+            if target is None:
+                target = Class.objects.create(class_number=number + 1, division=division)
+                classes[(number + 1, division)] = target
+                created.append(str(target))
+            promoted += User.objects.filter(role='student', school_class=source).update(
+                school_class=target, className=str(number + 1), division=division, updated_at=now
+            )
+
+        teachers_changed = _assign_class_teachers(
+            classes, next_class_teachers(classes, final_class, teachers, assignments)
+        )
+        class_ids = [class_obj.pk for class_obj in classes.values()]
+        refresh_students_counts(class_ids)
+        mark_class_dashboards_dirty(class_ids)
+        invalidate(User, Class)
+        # Graduates must stop authenticating and promoted students show their new class
+        for pk in moved:
+            user_cache.invalidate(pk)
+
+    return {
+        'snapshot': snapshot,
+        'graduated': graduated,
+        'promoted': promoted,
+        'created_classes': created,
+        'teachers_changed': teachers_changed,
+    }
@@ -0,0 +1,188 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import User, Class, Attendance, AttendanceArchive, AttendanceRollup, AttendanceSheet, SchoolCounters
+from .query_cache import invalidate
+
+COUNTERS_PK = 1
+ROLE_COUNTERS = {'student': 'students', 'teacher': 'teachers'}
+
+
+def rollup_key(day, class_name, division):
+    """Normalized (date, class_name, division) key of an attendance row"""
+    if isinstance(day, str):
+        day = parse_date(day)
+    return (day, str(class_name), division or '')
+
+
+def attendance_delta(deltas, key, status, sign=1):
+    """Add (or with ``sign=-1`` remove) one attendance row to a delta mapping"""
+    counts = deltas[key]
+    counts[0 if status == 'Present' else 1] += sign
+
+
+def new_deltas():
+    return defaultdict(lambda: [0, 0])
+
+
+def apply_attendance_deltas(deltas):
+    """Apply {key: [present, absent]} changes to the daily roll-up atomically"""
+    changed = {key: counts for key, counts in deltas.items() if any(counts)}
+    if not changed:
+        return
+    AttendanceRollup.objects.bulk_create(
+        [AttendanceRollup(date=d, class_name=c, division=div) for d, c, div in changed],
+        ignore_conflicts=True,
+    )
+    for (day, class_name, division), (present, absent) in changed.items():
+        AttendanceRollup.objects.filter(date=day, class_name=class_name, division=division).update(
+            present=F('present') + present,
+            absent=F('absent') + absent,
+            total=F('total') + present + absent,
+        )
+
+    today = date.today()
+    today_counts = [counts for (day, _, _), counts in changed.items() if day == today]
+    if today_counts:
+        present = sum(counts[0] for counts in today_counts)
+        total = sum(counts[0] + counts[1] for counts in today_counts)
+        # attendance_date goes last: MySQL applies SET clauses left to right
+        SchoolCounters.objects.filter(pk=COUNTERS_PK).update(
+            present_today=Case(When(attendance_date=today, then=F('present_today') + present), default=Value(present)),
+            total_today=Case(When(attendance_date=today, then=F('total_today') + total), default=Value(total)),
+            attendance_date=Value(today),
+        )
+
+
+def rebuild_attendance_rollup(start_date=None, end_date=None, batch_size=1000):
+    """Recompute the roll-up from the raw attendance rows (live and archived) and sheets; returns rows written"""
+    # Archived academic years keep their history
+    attendance = [Attendance.objects.all(), AttendanceArchive.objects.all()]
+    sheets = AttendanceSheet.objects.all()
+    rollups = AttendanceRollup.objects.all()
+    if start_date:
+        attendance = [rows.filter(date__gte=start_date) for rows in attendance]
+        sheets = sheets.filter(date__gte=start_date)
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date:
+        attendance = [rows.filter(date__lte=end_date) for rows in attendance]
+        sheets = sheets.filter(date__lte=end_date)
+        rollups = rollups.filter(date__lte=end_date)
+
+    merged = new_deltas()
+    for rows in attendance:
+        grouped = rows.values('date', 'class_name', 'division').annotate(
+            present=Count('id', filter=Q(status='Present')),
+            total=Count('id'),
+        ).order_by()
+        for row in grouped.iterator():
+            # NULL and empty divisions share a roll-up row
+            key = rollup_key(row['date'], row['class_name'], row['division'])
+            merged[key][0] += row['present']
+            merged[key][1] += row['total'] - row['present']
+    for sheet in sheets.select_related('school_class').iterator():
+        key = rollup_key(sheet.date, sheet.school_class.class_number, sheet.school_class.division)
+        for status in sheet.entries().values():
+            attendance_delta(merged, key, status)
+
+    with transaction.atomic():
+        rollups.delete()
+        AttendanceRollup.objects.bulk_create(
+            [
+                AttendanceRollup(date=d, class_name=c, division=div, present=p, absent=a, total=p + a)
+                for (d, c, div), (p, a) in merged.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(merged)
+
+
+def attendance_totals(**filters):
+    """Summed present/absent/total counts of the roll-up rows matching ``filters``"""
+    totals = AttendanceRollup.objects.filter(**filters).aggregate(
+        present=Sum('present'), absent=Sum('absent'), total=Sum('total')
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def adjust_school_counters(**deltas):
+    """Atomically add ``deltas`` (e.g. ``students=1``) to the school counters"""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes:
+        SchoolCounters.objects.filter(pk=COUNTERS_PK).update(**changes)
+
+
+def adjust_role_counter(role, delta):
+    field = ROLE_COUNTERS.get(role)
+    if field:
+        adjust_school_counters(**{field: delta})
+
+
+def adjust_students_count(class_id, delta):
+    """Atomically add ``delta`` to a class's ``students_count``"""
+    if class_id and delta:
+        Class.objects.filter(pk=class_id).update(students_count=F('students_count') + delta, updated_at=timezone.now())
+        invalidate(Class)
+
+
+def counted_students_count():
+    """Subquery counting the students enrolled in the outer class"""
+    students = User.objects.filter(school_class=OuterRef('pk'), role='student').order_by().values('school_class')
+    return Coalesce(Subquery(students.annotate(n=Count('pk')).values('n')), 0)
+
+
+def refresh_students_counts(class_ids=None):
+    """Recount ``students_count`` from the enrolled students of every (or the given) class.
+
+    Returns ``(class_id, stored, counted)`` for each class whose stored count had drifted.
+    """
+    classes = Class.objects.all() if class_ids is None else Class.objects.filter(pk__in=class_ids)
+    drifted = [
+        row for row in classes.annotate(counted=counted_students_count()).values_list('pk', 'students_count', 'counted')
+        if row[1] != row[2]
+    ]
+    if drifted:
+        # Count again inside the UPDATE so enrolments since the read are not lost
+        Class.objects.filter(pk__in=[row[0] for row in drifted]).update(
+            students_count=counted_students_count(), updated_at=timezone.now()
+        )
+        invalidate(Class)
+    return drifted
+
+
+def refresh_school_counters():
+    """Recount the school counters from the source tables"""
+    today = date.today()
+    roles = dict(
+        User.objects.filter(role__in=ROLE_COUNTERS).values_list('role').annotate(n=Count('id')).order_by()
+    )
+    today_totals = attendance_totals(date=today)
+    counters, _ = SchoolCounters.objects.update_or_create(
+        pk=COUNTERS_PK,
+        defaults={
+            'students': roles.get('student', 0),
+            'teachers': roles.get('teacher', 0),
+            'classes': Class.objects.count(),
+            'attendance_date': today,
+            'present_today': today_totals['present'],
+            'total_today': today_totals['total'],
+        },
+    )
+    return counters
+
+
+def load_school_counters():
+    """The school counters row, created from a full recount the first time"""
+    counters = SchoolCounters.objects.filter(pk=COUNTERS_PK).first()
+    if counters is None:
+        counters = refresh_school_counters()
+    if counters.attendance_date != date.today():
+        # Nothing has been marked yet today
+        counters.present_today = counters.total_today = 0
+    return counters
@@ -1,7 +1,36 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from .models import User, Class, Attendance, Leave, Subject, Event, Marks, Assignment, Resource
 
-class UserSerializer(serializers.ModelSerializer):
+def requested_fields(request, param):
+    """Field names from ``?<param>=a,b`` (repeatable), or None when the param is absent"""
+    values = request.query_params.getlist(param)
+    if not values:
+        return None
+    return {name.strip() for value in values for name in value.split(',') if name.strip()}
+
+class SparseFieldsMixin:
+    """Keep only ``?fields=a,b`` and drop ``?exclude=a,b`` on read requests.
+
+    The fields are removed before ``eager_load`` inspects the serializer, so
+    the query also selects only the columns and joins the kept fields read.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        keep = requested_fields(request, 'fields')
+        drop = requested_fields(request, 'exclude') or set()
+        unknown = ((keep or set()) | drop) - self.fields.keys()
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+        for name in list(self.fields):
+            if name in drop or (keep is not None and name not in keep):
+                self.fields.pop(name)
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     
     class Meta:
@@ -17,7 +46,7 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
     userType = serializers.CharField()
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class_teacher_name = serializers.CharField(source='class_teacher.name', read_only=True, allow_null=True)
     class_teacher_subject = serializers.CharField(source='class_teacher.subject', read_only=True, allow_null=True)
     class_teacher_email = serializers.EmailField(source='class_teacher.email', read_only=True, allow_null=True)
@@ -26,15 +55,18 @@ class ClassSerializer(serializers.ModelSerializer):
     class Meta:
         model = Class
         fields = '__all__'
+        read_only_fields = ['students_count']
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
+    marked_by = serializers.CharField(source='teacher.name', read_only=True)
     
     class Meta:
         model = Attendance
         fields = '__all__'
+        read_only_fields = ['school_class']
 
-class LeaveSerializer(serializers.ModelSerializer):
+class LeaveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Make student a proper writable FK field
     student = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role='student'))
     id = serializers.IntegerField(read_only=True)
@@ -63,19 +95,20 @@ class LeaveSerializer(serializers.ModelSerializer):
 #         fields = '__all__'
 #         read_only_fields = ['id', 'student', 'created_at', 'updated_at', 'student_name']
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='class_teacher.name', read_only=True, allow_null=True)
     
     class Meta:
         model = Subject
         fields = ['id', 'name', 'class_name', 'class_teacher', 'teacher_name']
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = '__all__'
+        read_only_fields = ['school_class']
 
-class MarksSerializer(serializers.ModelSerializer):
+class MarksSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     teacher_name = serializers.CharField(source='teacher.name', read_only=True)
     
@@ -100,14 +133,16 @@ class MarksSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'percentage', 'created_at', 'updated_at', 'student_name', 'teacher_name']
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Assignment
         fields = '__all__'
+        read_only_fields = ['school_class']
 
-class ResourceSerializer(serializers.ModelSerializer):
+class ResourceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='teacher.name', read_only=True)
     
     class Meta:
         model = Resource
         fields = '__all__'
+        read_only_fields = ['school_class']
@@ -0,0 +1,521 @@
+import csv
+import io
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .attendance_sheets import sheet_row
+from .dashboards import mark_class_dashboards_dirty
+from .query_cache import cached_queryset, invalidate
+from .rollups import adjust_role_counter, adjust_students_count, apply_attendance_deltas, attendance_delta, new_deltas, rollup_key
+from .models import (
+    User, Class, Attendance, AttendanceSheet, Subject, Event, Marks, Assignment, Resource, TeachingAssignment, academic_year_of,
+    CLASS_NAME_RE, parse_class_name
+)
+
+ATTENDANCE_UPSERT_FIELDS = ['teacher', 'status', 'class_name', 'division', 'school_class', 'updated_at']
+
+# model -> (class name field, division field); subjects store "9A" in one column
+CLASS_NAME_FIELDS = {
+    User: ('className', 'division'),
+    Attendance: ('class_name', 'division'),
+    Marks: ('class_name', 'division'),
+    Assignment: ('class_name', 'division'),
+    Resource: ('class_name', 'division'),
+    Event: ('class_name', 'division'),
+    Subject: ('class_name', None),
+}
+
+
+def class_name_values(model, class_obj):
+    """The class name/division column values ``model`` stores for ``class_obj``"""
+    name_field, division_field = CLASS_NAME_FIELDS[model]
+    if division_field is None:
+        return {name_field: f'{class_obj.class_number}{class_obj.division}'}
+    return {name_field: str(class_obj.class_number), division_field: class_obj.division}
+
+
+def class_ids(class_number=None, division=None):
+    """Ids of the classes with this number and/or division, read through the query cache"""
+    classes = Class.objects.all()
+    if class_number is not None:
+        classes = classes.filter(class_number=class_number)
+    if division:
+        classes = classes.filter(division=division)
+    return cached_queryset(classes.order_by('pk').values_list('pk', flat=True))
+
+
+def class_filter(class_name=None, division=None):
+    """``school_class_id`` lookup for the class name ("9" or "9A") and division query params.
+
+    The classes are resolved once, so list filters are integer key lookups; ``{}`` when neither is given.
+    """
+    if not class_name and not division:
+        return {}
+    number = None
+    if class_name:
+        match = CLASS_NAME_RE.match(str(class_name))
+        if not match:
+            return {'school_class_id__in': []}
+        number, division = int(match.group(1)), division or match.group(2)
+    return {'school_class_id__in': class_ids(number, division.strip().upper() if division else None)}
+
+
+def resolve_school_class_id(model, instance):
+    """Id of the Class named by ``instance``'s class name/division strings, or None"""
+    name_field, division_field = CLASS_NAME_FIELDS[model]
+    key = parse_class_name(
+        getattr(instance, name_field), getattr(instance, division_field) if division_field else None
+    )
+    if key is None:
+        return None
+    ids = class_ids(*key)
+    return ids[0] if ids else None
+
+
+def class_strings(model, instance):
+    """The class name/division values ``instance`` holds, or None if one of them was deferred"""
+    fields = [field for field in CLASS_NAME_FIELDS[model] if field]
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return tuple(instance.__dict__[field] for field in fields)
+
+
+def link_class_rows(class_obj):
+    """Attach rows naming ``class_obj`` to it and rewrite the strings of rows already attached.
+
+    Run after a class is created (rows may predate it) or renumbered.
+    """
+    for model in CLASS_NAME_FIELDS:
+        values = class_name_values(model, class_obj)
+        now = timezone.now()
+        model.objects.filter(school_class__isnull=True, **values).update(school_class=class_obj, updated_at=now)
+        model.objects.filter(school_class=class_obj).exclude(**values).update(**values, updated_at=now)
+    invalidate(*CLASS_NAME_FIELDS)
+
+
+def teaching_pairs(class_ids):
+    """``(class_id, subject, teacher_id)`` for every subject teacher the given classes name.
+
+    Teachers come from each class's ``subject_teachers`` JSON (``{subject: teacher id}``)
+    and from the ``class_teacher`` of the class's Subject rows.
+    """
+    pairs = set(
+        Subject.objects.filter(school_class_id__in=class_ids, class_teacher__isnull=False)
+        .values_list('school_class_id', 'name', 'class_teacher_id')
+    )
+    for class_id, mapping in Class.objects.filter(pk__in=class_ids).values_list('pk', 'subject_teachers'):
+        if not isinstance(mapping, dict):
+            continue
+        for subject, teacher_id in mapping.items():
+            if str(teacher_id).isdigit() and subject and len(subject) <= 100:
+                pairs.add((class_id, subject, int(teacher_id)))
+
+    teachers = set(
+        User.objects.filter(pk__in={teacher_id for _, _, teacher_id in pairs}, role='teacher')
+        .values_list('pk', flat=True)
+    )
+    return {pair for pair in pairs if pair[2] in teachers}
+
+
+def sync_teaching_assignments(class_ids):
+    """Make the TeachingAssignment rows of the given classes match ``teaching_pairs``"""
+    class_ids = [pk for pk in class_ids if pk]
+    if not class_ids:
+        return
+    wanted = teaching_pairs(class_ids)
+    existing = {
+        (class_id, subject, teacher_id): pk
+        for pk, class_id, subject, teacher_id in TeachingAssignment.objects.filter(
+            school_class_id__in=class_ids
+        ).values_list('pk', 'school_class_id', 'subject', 'teacher_id')
+    }
+    stale = [pk for pair, pk in existing.items() if pair not in wanted]
+    if stale:
+        TeachingAssignment.objects.filter(pk__in=stale).delete()
+    missing = wanted - existing.keys()
+    TeachingAssignment.objects.bulk_create(
+        [TeachingAssignment(school_class_id=c, subject=s, teacher_id=t) for c, s, t in missing],
+        ignore_conflicts=True,
+    )
+    if stale or missing:
+        # Bulk writes send no signals
+        invalidate(TeachingAssignment)
+
+
+def _validated_mark_records(records):
+    """Check bulk mark records, returning the outcomes list and the records to write.
+
+    Skipped and unknown-student records get their outcome filled in; a later
+    record for the same student supersedes an earlier one. Student ids are
+    validated with one query. The records to write come back as
+    ``(index, student id)`` pairs.
+    """
+    outcomes = [None] * len(records)
+    latest_by_student = {}
+
+    for index, record in enumerate(records):
+        student_id = record.get('studentId')
+        if not student_id:
+            outcomes[index] = {'studentId': student_id, 'status': 'skipped', 'detail': 'studentId is required'}
+            continue
+        student_id = str(student_id)
+        if student_id in latest_by_student:
+            previous = latest_by_student[student_id]
+            outcomes[previous] = {'studentId': records[previous].get('studentId'), 'status': 'skipped',
+                                  'detail': 'Superseded by a later record for the same student'}
+        latest_by_student[student_id] = index
+
+    valid_ids = {
+        str(pk) for pk in User.objects.filter(
+            id__in=[sid for sid in latest_by_student if sid.isdigit()]
+        ).values_list('id', flat=True)
+    }
+
+    valid = []
+    for student_id, index in latest_by_student.items():
+        if student_id not in valid_ids:
+            outcomes[index] = {'studentId': records[index].get('studentId'), 'status': 'error',
+                               'detail': 'Student not found'}
+            continue
+        valid.append((index, int(student_id)))
+    return outcomes, valid
+
+
+def bulk_mark_attendance(class_obj, teacher, date, records):
+    """Create or update one attendance row per record in a single transaction.
+
+    Student ids are validated with one query and all rows are written with a
+    single upsert on the ``(student, date)`` unique key. Returns one outcome
+    dict per input record, in input order.
+    """
+    outcomes, valid = _validated_mark_records(records)
+    rows = [
+        (index, Attendance(
+            student_id=student_id,
+            teacher=teacher,
+            date=date,
+            status='Present' if records[index].get('present', False) else 'Absent',
+            class_name=str(class_obj.class_number),
+            division=class_obj.division,
+            school_class=class_obj,
+            academic_year=academic_year_of(date)
+        ))
+        for index, student_id in valid
+    ]
+
+    with transaction.atomic():
+        existing = {
+            row[0]: row for row in Attendance.objects.filter(
+                date=date, student_id__in=[obj.student_id for _, obj in rows]
+            ).select_for_update().values_list('student_id', 'class_name', 'division', 'status')
+        }
+        if rows:
+            Attendance.objects.bulk_create(
+                [obj for _, obj in rows],
+                update_conflicts=True,
+                unique_fields=_upsert_unique_fields(['student', 'date']),
+                update_fields=ATTENDANCE_UPSERT_FIELDS,
+            )
+            # bulk_create bypasses the model signals
+            deltas = new_deltas()
+            for _, obj in rows:
+                if obj.student_id in existing:
+                    _, old_class, old_division, old_status = existing[obj.student_id]
+                    attendance_delta(deltas, rollup_key(date, old_class, old_division), old_status, sign=-1)
+                attendance_delta(deltas, rollup_key(date, obj.class_name, obj.division), obj.status)
+            apply_attendance_deltas(deltas)
+            mark_class_dashboards_dirty([class_obj.pk])
+
+    for index, obj in rows:
+        outcomes[index] = {
+            'studentId': records[index].get('studentId'),
+            'status': 'updated' if obj.student_id in existing else 'created',
+            'attendance': obj.status,
+        }
+    return outcomes
+
+
+def write_sheet_entries(class_obj, teacher, date, changes, updated_by=None):
+    """Apply ``{student id: status or None}`` to a class-day attendance sheet.
+
+    The sheet is locked (or created) and written back as one row; ``None``
+    unmarks a student. Sheets have no per-student signals, so the roll-up and
+    the class dashboard are updated here. ``teacher`` may be None to keep the
+    sheet's. Returns the sheet (None if there was nothing to write) and the
+    statuses it held before.
+    """
+    with transaction.atomic():
+        sheet = AttendanceSheet.objects.select_for_update().filter(school_class=class_obj, date=date).first()
+        created = sheet is None
+        if created:
+            if teacher is None or not any(changes.values()):
+                return None, {}
+            sheet = AttendanceSheet(school_class=class_obj, date=date)
+        sheet.school_class = class_obj
+        previous = sheet.entries()
+        entries = {**previous, **changes}
+        sheet.set_entries({student_id: status for student_id, status in entries.items() if status})
+        if teacher is not None:
+            sheet.teacher = teacher
+        if updated_by is not None:
+            sheet.updated_by = updated_by
+
+        if created:
+            try:
+                with transaction.atomic():
+                    sheet.save(force_insert=True)
+            except IntegrityError:
+                # A concurrent first mark created the sheet; apply the changes on top of it
+                return write_sheet_entries(class_obj, teacher, date, changes, updated_by)
+        else:
+            sheet.save(update_fields=['roster', 'statuses', 'teacher', 'updated_by', 'updated_at'])
+
+        deltas = new_deltas()
+        key = rollup_key(date, class_obj.class_number, class_obj.division)
+        for student_id, status in changes.items():
+            if previous.get(student_id) == status:
+                continue
+            if student_id in previous:
+                attendance_delta(deltas, key, previous[student_id], sign=-1)
+            if status:
+                attendance_delta(deltas, key, status)
+        apply_attendance_deltas(deltas)
+        mark_class_dashboards_dirty([class_obj.pk])
+    return sheet, previous
+
+
+def mark_attendance_sheet(class_obj, teacher, date, records):
+    """``bulk_mark_attendance`` for sheet storage: the class-day is one locked read and one write"""
+    outcomes, valid = _validated_mark_records(records)
+    statuses = {
+        student_id: 'Present' if records[index].get('present', False) else 'Absent'
+        for index, student_id in valid
+    }
+    previous = {}
+    if statuses:
+        _, previous = write_sheet_entries(class_obj, teacher, date, statuses)
+
+    for index, student_id in valid:
+        outcomes[index] = {
+            'studentId': records[index].get('studentId'),
+            'status': 'updated' if student_id in previous else 'created',
+            'attendance': statuses[student_id],
+        }
+    return outcomes
+
+
+def save_sheet_row(class_obj, values, instance=None):
+    """Write one attendance row, given as serializer values, to its class-day sheet.
+
+    Moving an existing row to another class or day unmarks it on the sheet
+    it came from. Returns the Attendance-shaped row.
+    """
+    student = values['student']
+    with transaction.atomic():
+        if instance is not None and (instance.school_class_id != class_obj.pk or instance.date != values['date']):
+            write_sheet_entries(instance.school_class, None, instance.date, {instance.student_id: None})
+        sheet, _ = write_sheet_entries(
+            class_obj, values['teacher'], values['date'], {student.pk: values['status']},
+            updated_by=values.get('updated_by')
+        )
+    return sheet_row(sheet, sheet.roster.index(student.pk), values['status'], student)
+
+
+def delete_sheet_row(instance):
+    """Unmark the student of an Attendance-shaped sheet row"""
+    write_sheet_entries(instance.school_class, None, instance.date, {instance.student_id: None})
+
+
+def _upsert_unique_fields(fields):
+    """MySQL upserts on any unique key and rejects an explicit conflict target"""
+    if connection.features.supports_update_conflicts_with_target:
+        return fields
+    return None
+
+
+# Bulk user import
+USER_IMPORT_FIELDS = ['name', 'email', 'role', 'password', 'className', 'division', 'subject', 'phone']
+DEFAULT_IMPORT_PASSWORD = 'defaultpassword'
+INLINE_HASH_LIMIT = 32
+
+
+def read_user_rows(content, filename=''):
+    """Parse an uploaded CSV or JSON user file into a list of dicts"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json') or content.lstrip().startswith(('[', '{')):
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get('users', [])
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON list of users')
+        return data
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def _init_hash_worker():
+    # Spawned workers (Windows, macOS) start without Django configured
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash passwords across a process pool; small batches are hashed inline"""
+    workers = workers or os.cpu_count() or 1
+    if len(passwords) <= INLINE_HASH_LIMIT or workers == 1:
+        return [make_password(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        return list(pool.map(_hash_password, passwords, chunksize=chunksize))
+
+
+# JSON files may give class and phone numbers as numbers
+NUMERIC_IMPORT_FIELDS = {'className', 'phone'}
+# Checked against the model's own field validators (max_length and the like)
+MODEL_CHECKED_IMPORT_FIELDS = ['name', 'email', 'className', 'division', 'subject', 'phone']
+
+
+def _import_value(row, field, errors):
+    """``row[field]`` as a stripped string, '' when missing; non-strings are reported"""
+    value = row.get(field)
+    if value is None:
+        return ''
+    if field in NUMERIC_IMPORT_FIELDS and isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        errors[field] = f'{field} must be a string'
+        return ''
+    return value.strip()
+
+
+def _validate_user_row(row, seen_emails):
+    """``(values, errors)`` of one import row; ``seen_emails`` maps lowercased emails to row numbers"""
+    errors = {}
+    values = {field: _import_value(row, field, errors) for field in USER_IMPORT_FIELDS}
+    values['email'] = User.objects.normalize_email(values['email'])
+    values['role'] = values['role'].lower()
+
+    if not values['name'] and 'name' not in errors:
+        errors['name'] = 'name is required'
+    if not values['email'] and 'email' not in errors:
+        errors['email'] = 'email is required'
+    elif values['email']:
+        try:
+            validate_email(values['email'])
+        except ValidationError:
+            errors['email'] = 'email is not valid'
+    if values['role'] not in dict(User.ROLE_CHOICES) and 'role' not in errors:
+        errors['role'] = f"role must be one of {', '.join(dict(User.ROLE_CHOICES))}"
+
+    checked = [field for field in MODEL_CHECKED_IMPORT_FIELDS if field not in errors]
+    user = User(**{field: values[field] or None for field in checked})
+    try:
+        user.clean_fields(exclude=[f.name for f in User._meta.fields if f.name not in checked])
+    except ValidationError as exc:
+        for field, messages in exc.message_dict.items():
+            errors[field] = f"{field}: {' '.join(messages)}"
+
+    email_key = values['email'].lower()
+    if email_key and email_key in seen_emails:
+        errors['duplicate'] = f'duplicate email (also on row {seen_emails[email_key]})'
+    return values, list(errors.values())
+
+
+def import_users(rows, default_password=DEFAULT_IMPORT_PASSWORD, batch_size=500, workers=None):
+    """Validate and insert users in bulk.
+
+    Every row is validated in one pass (with a single query for emails that
+    already exist), passwords are hashed in parallel and valid rows are
+    inserted with ``bulk_create`` in batches. Invalid rows, and rows the
+    database rejects, are reported and skipped. Emails are compared
+    case-insensitively. Returns ``(created_count, errors)``.
+    """
+    errors = []
+    seen_emails = {}
+    valid = []
+
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'email': None, 'errors': ['row must be an object']})
+            continue
+        values, row_errors = _validate_user_row(row, seen_emails)
+        if row_errors:
+            errors.append({'row': number, 'email': values['email'] or None, 'errors': row_errors})
+            continue
+        seen_emails[values['email'].lower()] = number
+        valid.append((number, values))
+
+    existing = set(
+        User.objects.annotate(email_key=Lower('email'))
+        .filter(email_key__in=list(seen_emails)).values_list('email_key', flat=True)
+    )
+    pending = []
+    for number, values in valid:
+        if values['email'].lower() in existing:
+            errors.append({
+                'row': number, 'email': values['email'], 'errors': ['a user with this email already exists']
+            })
+        else:
+            pending.append((number, values))
+
+    class_ids = {
+        (number, division): pk for pk, number, division in Class.objects.values_list('pk', 'class_number', 'division')
+    }
+    hashes = hash_passwords([values['password'] or default_password for _, values in pending], workers)
+    users = []
+    for (number, values), password in zip(pending, hashes):
+        users.append((number, User(
+            email=values['email'],
+            password=password,
+            name=values['name'],
+            role=values['role'],
+            className=values['className'] or None,
+            division=values['division'] or None,
+            school_class_id=class_ids.get(parse_class_name(values['className'], values['division'])),
+            subject=values['subject'] or None,
+            phone=values['phone'] or None,
+        )))
+
+    created = []
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in batch])
+            created.extend(user for _, user in batch)
+        except DatabaseError:
+            # Someone else inserted one of these emails meanwhile, or the database
+            # rejected a value; retry row by row so only the failing rows are lost
+            for number, user in batch:
+                try:
+                    with transaction.atomic():
+                        User.objects.bulk_create([user])
+                    created.append(user)
+                except DatabaseError as exc:
+                    errors.append({'row': number, 'email': user.email, 'errors': [str(exc)]})
+
+    # bulk_create bypasses the model signals
+    invalidate(User)
+    roles = Counter(user.role for user in created)
+    for role, count in roles.items():
+        adjust_role_counter(role, count)
+    enrolled = Counter(user.school_class_id for user in created if user.role == 'student' and user.school_class_id)
+    for class_id, count in enrolled.items():
+        adjust_students_count(class_id, count)
+    mark_class_dashboards_dirty({user.school_class_id for user in created if user.school_class_id})
+
+    errors.sort(key=lambda error: error['row'])
+    return len(created), errors
@@ -0,0 +1,267 @@
+from datetime import date
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+
+from .authentication import user_cache
+from .dashboards import mark_class_dashboards_dirty, mark_dashboards_dirty, mark_teacher_dashboard_dirty
+from .rollups import (
+    adjust_role_counter, adjust_school_counters, adjust_students_count, apply_attendance_deltas, attendance_delta,
+    new_deltas, refresh_students_counts, rollup_key
+)
+from .models import (
+    User, Class, Attendance, AttendanceSheet, Leave, Subject, Event, Marks, Assignment, Resource, TeachingAssignment,
+    academic_year_of
+)
+from .query_cache import invalidate
+from .services import class_strings, link_class_rows, resolve_school_class_id, sync_teaching_assignments
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Attendance)
+@receiver(pre_save, sender=Marks)
+@receiver(pre_save, sender=Assignment)
+@receiver(pre_save, sender=Resource)
+@receiver(pre_save, sender=Event)
+@receiver(pre_save, sender=Subject)
+def link_school_class(sender, instance, raw=False, **kwargs):
+    """Keep the Class foreign key in step with the class name/division strings, resolving only when they changed
+    or the row is not linked yet"""
+    if raw:
+        return
+    strings = class_strings(sender, instance)
+    if (instance._state.adding or instance.school_class_id is None or strings is None
+            or strings != getattr(instance, '_class_strings', None)):
+        instance.school_class_id = resolve_school_class_id(sender, instance)
+        instance._class_strings = strings
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Attendance)
+@receiver(post_init, sender=Marks)
+@receiver(post_init, sender=Assignment)
+@receiver(post_init, sender=Resource)
+@receiver(post_init, sender=Event)
+@receiver(post_init, sender=Subject)
+def remember_class_strings(sender, instance, **kwargs):
+    """Note the class strings an instance was loaded with, so saves that keep them skip the lookup"""
+    instance._class_strings = class_strings(sender, instance)
+
+
+@receiver(pre_save, sender=Attendance)
+def set_attendance_academic_year(sender, instance, raw=False, **kwargs):
+    if not raw:
+        day = parse_date(instance.date) if isinstance(instance.date, str) else instance.date
+        instance.academic_year = academic_year_of(day)
+
+
+@receiver(pre_save, sender=Marks)
+def set_marks_academic_year(sender, instance, raw=False, **kwargs):
+    # Marks carry no date; they belong to the year they were first entered in
+    if not raw and instance.academic_year is None:
+        instance.academic_year = academic_year_of(instance.created_at or date.today())
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_user_state(sender, instance, raw=False, **kwargs):
+    """Keep the stored role/class of a user so post_save can see what changed"""
+    instance._previous_state = None
+    if instance.pk and not raw:
+        instance._previous_state = sender.objects.filter(pk=instance.pk).values(
+            'role', 'school_class'
+        ).first()
+
+
+@receiver(pre_save, sender=Class)
+def remember_previous_class(sender, instance, raw=False, **kwargs):
+    """Keep the stored number/division of a class so post_save can relink its rows"""
+    instance._previous_state = None
+    if instance.pk and not raw:
+        instance._previous_state = sender.objects.filter(pk=instance.pk).values(
+            'class_number', 'division'
+        ).first()
+
+
+@receiver(pre_save, sender=Subject)
+def remember_previous_subject_class(sender, instance, raw=False, **kwargs):
+    """Keep the stored class of a subject so its old class's teaching assignments can be resynced"""
+    instance._previous_class_id = None
+    if instance.pk and not raw:
+        instance._previous_class_id = sender.objects.filter(pk=instance.pk).values_list(
+            'school_class', flat=True
+        ).first()
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, raw=False, **kwargs):
+    """Keep the stored roll-up key/status of an attendance row being updated"""
+    instance._previous_state = None
+    if instance.pk and not raw:
+        instance._previous_state = sender.objects.filter(pk=instance.pk).values(
+            'date', 'class_name', 'division', 'status'
+        ).first()
+
+
+# Attendance roll-up
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = new_deltas()
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        attendance_delta(deltas, rollup_key(previous['date'], previous['class_name'], previous['division']),
+                         previous['status'], sign=-1)
+    attendance_delta(deltas, rollup_key(instance.date, instance.class_name, instance.division), instance.status)
+    apply_attendance_deltas(deltas)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    deltas = new_deltas()
+    attendance_delta(deltas, rollup_key(instance.date, instance.class_name, instance.division),
+                     instance.status, sign=-1)
+    apply_attendance_deltas(deltas)
+
+
+@receiver(pre_delete, sender=AttendanceSheet)
+def attendance_sheet_deleted(sender, instance, **kwargs):
+    # pre_delete: a cascade from its class still needs the class's number/division
+    deltas = new_deltas()
+    key = rollup_key(instance.date, instance.school_class.class_number, instance.school_class.division)
+    for status in instance.entries().values():
+        attendance_delta(deltas, key, status, sign=-1)
+    apply_attendance_deltas(deltas)
+
+
+# Class foreign keys
+@receiver(post_save, sender=Class)
+def class_saved_links(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if raw:
+        return
+    if created or previous != {'class_number': instance.class_number, 'division': instance.division}:
+        link_class_rows(instance)
+    # A full save may have written back a students_count read before a concurrent enrolment
+    refresh_students_counts([instance.pk])
+    sync_teaching_assignments([instance.pk])
+
+
+# Teaching assignments
+@receiver([post_save, post_delete], sender=Subject)
+def subject_changed_teaching(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_teaching_assignments({instance.school_class_id, getattr(instance, '_previous_class_id', None)})
+
+
+# Authentication cache
+@receiver([post_save, post_delete], sender=User)
+def user_cache_invalidate(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+# Query cache versions
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=TeachingAssignment)
+def reference_data_changed(sender, **kwargs):
+    invalidate(sender)
+
+
+# School counters
+@receiver(post_save, sender=User)
+def user_saved_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if created:
+        adjust_role_counter(instance.role, 1)
+    elif previous and previous['role'] != instance.role:
+        adjust_role_counter(previous['role'], -1)
+        adjust_role_counter(instance.role, 1)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_counters(sender, instance, **kwargs):
+    adjust_role_counter(instance.role, -1)
+
+
+def enrolled_class_id(role, class_id):
+    return class_id if role == 'student' else None
+
+
+@receiver(post_save, sender=User)
+def user_saved_students_count(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    old_class = enrolled_class_id(previous['role'], previous['school_class']) if previous else None
+    new_class = enrolled_class_id(instance.role, instance.school_class_id)
+    if old_class != new_class:
+        adjust_students_count(old_class, -1)
+        adjust_students_count(new_class, 1)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_students_count(sender, instance, **kwargs):
+    adjust_students_count(enrolled_class_id(instance.role, instance.school_class_id), -1)
+
+
+@receiver(post_save, sender=Class)
+def class_saved_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_school_counters(classes=1)
+
+
+@receiver(post_delete, sender=Class)
+def class_deleted_counters(sender, instance, **kwargs):
+    adjust_school_counters(classes=-1)
+
+
+# Dashboard snapshots
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=Marks)
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=Subject)
+def class_data_changed(sender, instance, **kwargs):
+    if instance.school_class_id:
+        mark_class_dashboards_dirty([instance.school_class_id])
+    else:
+        mark_dashboards_dirty(instance.class_name, getattr(instance, 'division', None))
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, **kwargs):
+    # Dashboards list the events of every division of a class number
+    mark_dashboards_dirty(instance.class_name)
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def leave_changed(sender, instance, **kwargs):
+    student = User.objects.filter(pk=instance.student_id).values('school_class').first()
+    if student:
+        mark_class_dashboards_dirty([student['school_class']])
+    else:
+        mark_dashboards_dirty()
+
+
+@receiver([post_save, post_delete], sender=Class)
+def class_changed(sender, instance, **kwargs):
+    mark_class_dashboards_dirty([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    if instance.role == 'teacher':
+        mark_teacher_dashboard_dirty(instance.pk)
+        return
+
+    class_ids = {instance.school_class_id}
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        class_ids.add(previous['school_class'])
+    mark_class_dashboards_dirty(class_ids)
@@ -0,0 +1,694 @@
+import re
+import unittest
+from datetime import date
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from .attendance_sheets import filter_sheets
+from .authentication import SignedTokenAuthentication, issue_token, user_cache
+from .integrity import link_rows, missing_class_rows, repair_rows, unlinked_rows
+from .management.seeding import seed_school
+from .models import (
+    User, Class, ClassMembership, Attendance, AttendanceSheet, DashboardSnapshot, Marks, Assignment, Resource, Subject,
+    TeachingAssignment
+)
+from .pagination import DateKeysetPagination
+from .rollover import rollover_academic_year
+from .rollups import load_school_counters, refresh_school_counters
+from .services import class_filter, import_users
+from .views import (
+    UserViewSet, ClassViewSet, AttendanceViewSet, LeaveViewSet, SubjectViewSet, EventViewSet, MarksViewSet,
+    AssignmentViewSet, ResourceViewSet,
+)
+
+# Maximum queries per endpoint, independent of how many rows it returns, with the
+# caches off. List and detail GETs of row data include the conditional GET validator
+# (one aggregate) where it can run without the cache, as for assignments.
+QUERY_BUDGETS = {
+    'users-list': 1,
+    'users-detail': 1,
+    'classes-list': 1,
+    'classes-detail': 1,
+    'classes-by-class-teacher': 1,
+    'classes-teacher-dashboard': 15,
+    'classes-subject-teacher-dashboard': 4,
+    'attendance-list': 2,
+    'attendance-detail': 1,
+    'leaves-list': 2,
+    'leaves-detail': 1,
+    'subjects-list': 1,
+    'subjects-detail': 1,
+    'events-list': 1,
+    'events-detail': 1,
+    'marks-list': 2,
+    'marks-detail': 1,
+    'marks-by-class': 2,
+    'assignments-list': 3,
+    'assignments-detail': 2,
+    'resources-list': 2,
+    'resources-detail': 1,
+    'admin-stats': 3,
+}
+# Hashing passwords properly dominates the run time of tests that create users
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+# Rows per table in the two seeded runs; counts must not grow between them
+BUDGET_SIZES = (2, 25)
+
+
+def budget_endpoints(ids):
+    return {
+        'users-list': '/api/users/',
+        'users-detail': f"/api/users/{ids['student']}/",
+        'classes-list': '/api/classes/',
+        'classes-detail': f"/api/classes/{ids['class']}/",
+        'classes-by-class-teacher': f"/api/classes/by_class_teacher/?teacher_id={ids['teacher']}",
+        'classes-teacher-dashboard': f"/api/classes/teacher_dashboard/?teacher_id={ids['teacher']}",
+        'classes-subject-teacher-dashboard': f"/api/classes/subject_teacher_dashboard/?teacher_id={ids['teacher']}",
+        'attendance-list': '/api/attendance/',
+        'attendance-detail': f"/api/attendance/{ids['attendance']}/",
+        'leaves-list': '/api/leaves/',
+        'leaves-detail': f"/api/leaves/{ids['leave']}/",
+        'subjects-list': '/api/subjects/',
+        'subjects-detail': f"/api/subjects/{ids['subject']}/",
+        'events-list': '/api/events/',
+        'events-detail': f"/api/events/{ids['event']}/",
+        'marks-list': '/api/marks/',
+        'marks-detail': f"/api/marks/{ids['marks']}/",
+        'marks-by-class': f"/api/marks/by_class/?class_id={ids['class']}",
+        'assignments-list': '/api/assignments/',
+        'assignments-detail': f"/api/assignments/{ids['assignment']}/",
+        'resources-list': '/api/resources/',
+        'resources-detail': f"/api/resources/{ids['resource']}/",
+        'admin-stats': '/api/admin/stats',
+    }
+
+
+@override_settings(QUERY_CACHE_ALIAS=None)
+class QueryBudgetTests(APITestCase):
+    """Every read endpoint stays within its query budget, however much data there is"""
+
+    def measure(self, size):
+        """Query count per endpoint against ``size`` seeded rows per table"""
+        with transaction.atomic():
+            ids = seed_school(size)
+            counts = {}
+            for name, url in budget_endpoints(ids).items():
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, f'{name}: GET {url}')
+                counts[name] = len(ctx.captured_queries)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_read_endpoints_within_budget(self):
+        small, large = (self.measure(size) for size in BUDGET_SIZES)
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertEqual(large[name], small[name], f'{name}: query count grows with the data')
+                self.assertLessEqual(large[name], budget, f'{name}: over its budget of {budget}')
+
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)')
+POSTGRES_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+PLANNED_VENDORS = ('mysql', 'sqlite', 'postgresql')
+
+
+def viewset_queryset(viewset_class, params):
+    """The queryset ``viewset_class`` would read for ``GET ?params`` on its list route"""
+    request = Request(APIRequestFactory().get('/', params))
+    view = viewset_class(request=request, format_kwarg=None, action='list', args=(), kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+def full_scans(queryset):
+    """Tables the database plans to read in full for ``queryset``"""
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [col[0] for col in cursor.description]
+            return [row['table'] for row in (dict(zip(columns, r)) for r in cursor.fetchall())
+                    if row['type'] == 'ALL']
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [m.group(1) for m in (SQLITE_SCAN_RE.match(r[-1]) for r in cursor.fetchall()) if m]
+        cursor.execute('EXPLAIN ' + sql, params)
+        return [m.group(1) for m in (POSTGRES_SCAN_RE.search(r[0]) for r in cursor.fetchall()) if m]
+
+
+def hot_queries():
+    # Values only need to be shaped like real ones; plans do not depend on matches
+    class_name, division, subject, exam_type = '10', 'Z', 'Seed Subject 0', 'Mid Term'
+    today = date.today().isoformat()
+    return {
+        'users-by-role-class': viewset_queryset(
+            UserViewSet, {'role': 'student', 'className': class_name, 'division': division}),
+        'attendance-by-class-date': viewset_queryset(AttendanceViewSet, {'className': class_name, 'date': today}),
+        'attendance-by-student': viewset_queryset(AttendanceViewSet, {'student': 1}),
+        'leaves-by-status': viewset_queryset(LeaveViewSet, {'status': 'Pending'}),
+        'leaves-by-student': viewset_queryset(LeaveViewSet, {'student': 1}),
+        'subjects-by-class': viewset_queryset(SubjectViewSet, {'className': f'{class_name}{division}'}),
+        'events-by-audience': viewset_queryset(EventViewSet, {'audience': 'CLASS'}),
+        'events-by-class': viewset_queryset(EventViewSet, {'className': class_name}),
+        'marks-by-class-subject-exam': viewset_queryset(
+            MarksViewSet, {'class_name': class_name, 'subject': subject, 'exam_type': exam_type}),
+        'marks-by-subject-exam': viewset_queryset(MarksViewSet, {'subject': subject, 'exam_type': exam_type}),
+        'marks-by-student': viewset_queryset(MarksViewSet, {'student_id': 1}),
+        'marks-by-class-division': Marks.objects.filter(class_name=class_name, division=division),
+        'students-by-class-id': User.objects.filter(school_class_id=1, role='student'),
+        'attendance-by-class-id-date': Attendance.objects.filter(school_class_id=1, date=today),
+        'sheets-by-class-date': filter_sheets(**class_filter(class_name, division), date=today),
+        'sheets-by-class-id-date': AttendanceSheet.objects.filter(school_class_id=1, date=today),
+        'marks-by-class-id-subject': Marks.objects.filter(school_class_id=1, subject=subject),
+        'assignments-by-class': viewset_queryset(AssignmentViewSet, {'class_name': class_name, 'division': division}),
+        'assignments-due-by-class': Assignment.objects.filter(
+            class_name=class_name, division=division, due_date__gte=today),
+        'resources-by-class-subject': viewset_queryset(
+            ResourceViewSet, {'class_name': class_name, 'division': division, 'subject': subject}),
+        'resources-by-class': Resource.objects.filter(class_name=class_name, division=division),
+        'classes-by-teacher': viewset_queryset(ClassViewSet, {'teacher_id': 1}),
+        'teaching-by-teacher': TeachingAssignment.objects.filter(teacher_id=1).select_related('school_class'),
+    }
+
+
+@unittest.skipUnless(connection.vendor in PLANNED_VENDORS, 'EXPLAIN is only parsed for MySQL, SQLite and PostgreSQL')
+class QueryPlanTests(TestCase):
+    """No hot filtered read of a ViewSet plans a full table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Enough classes that an index beats a scan for the planner
+        seed_school(20, class_count=10)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in hot_queries().items():
+            with self.subTest(query=name):
+                self.assertEqual(full_scans(queryset), [], f'{name} plans a full table scan')
+
+
+class AttendanceSummaryTests(APITestCase):
+    def test_impossible_dates_are_rejected(self):
+        for params in ({'start_date': '2024-02-30', 'end_date': '2024-03-01'}, {'start_date': '2024-02-01'}):
+            with self.subTest(**params):
+                response = self.client.get('/api/attendance/summary/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_valid_range(self):
+        response = self.client.get('/api/attendance/summary/', {'start_date': '2024-02-01', 'end_date': '2024-02-29'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['days'], [])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportUsersTests(TestCase):
+    """Bulk import skips the model signals, so it adjusts the counters and dashboards itself"""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(email='teacher@example.com', name='Teacher', role='teacher', password='pw')
+        cls.school_class = Class.objects.create(class_number=9, division='A', class_teacher=teacher)
+        User.objects.create_user(email='Taken@example.com', name='Taken', role='student', password='pw')
+
+    def setUp(self):
+        self.counters = refresh_school_counters()
+        DashboardSnapshot.objects.update_or_create(
+            school_class=self.school_class, defaults={'snapshot_date': date.today(), 'is_dirty': False, 'version': 3}
+        )
+
+    def import_rows(self, rows):
+        return import_users(rows, workers=1)
+
+    def test_valid_rows_update_counters_and_dashboards(self):
+        created, errors = self.import_rows([
+            {'name': 'Asha', 'email': 'asha@example.com', 'role': 'student', 'className': '9', 'division': 'A'},
+            {'name': 'Ravi', 'email': 'ravi@example.com', 'role': 'student', 'className': 9, 'division': 'A'},
+            {'name': 'Meena', 'email': 'meena@example.com', 'role': 'teacher', 'subject': 'Maths'},
+        ])
+        self.assertEqual((created, errors), (3, []))
+        self.school_class.refresh_from_db()
+        self.assertEqual(self.school_class.students_count, 2)
+        snapshot = DashboardSnapshot.objects.get(school_class=self.school_class)
+        self.assertTrue(snapshot.is_dirty)
+        self.assertEqual(snapshot.version, 4)
+        counters = load_school_counters()
+        self.assertEqual(counters.students, self.counters.students + 2)
+        self.assertEqual(counters.teachers, self.counters.teachers + 1)
+        self.assertEqual(User.objects.get(email='asha@example.com').school_class, self.school_class)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        created, errors = self.import_rows([
+            {'name': 123, 'email': 'number@example.com', 'role': 'student'},
+            {'name': 'Long', 'email': 'long@example.com', 'role': 'student', 'division': 'AB', 'phone': '1' * 16},
+            {'name': '', 'email': 'not-an-email', 'role': 'janitor'},
+            'not a row',
+            {'name': 'Fine', 'email': 'fine@example.com', 'role': 'student'},
+        ])
+        self.assertEqual(created, 1)
+        self.assertEqual([error['row'] for error in errors], [1, 2, 3, 4])
+        self.assertEqual(errors[0]['errors'], ['name must be a string'])
+        self.assertEqual(len(errors[1]['errors']), 2)
+        self.assertEqual(len(errors[2]['errors']), 3)
+        self.assertFalse(User.objects.filter(email__in=['number@example.com', 'long@example.com']).exists())
+
+    def test_duplicate_emails_in_the_file_and_the_database(self):
+        created, errors = self.import_rows([
+            {'name': 'First', 'email': 'Same@Example.com', 'role': 'student'},
+            {'name': 'Second', 'email': 'same@example.COM', 'role': 'student'},
+            {'name': 'Existing', 'email': 'taken@EXAMPLE.com', 'role': 'student'},
+        ])
+        self.assertEqual(created, 1)
+        self.assertEqual(errors, [
+            {'row': 2, 'email': 'same@example.com', 'errors': ['duplicate email (also on row 1)']},
+            {'row': 3, 'email': 'taken@example.com', 'errors': ['a user with this email already exists']},
+        ])
+        # Only the domain is normalised, as create_user does
+        self.assertTrue(User.objects.filter(email='Same@example.com').exists())
+        self.assertEqual(load_school_counters().students, self.counters.students + 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email='t@example.com', name='Teacher', role='teacher', password='pw')
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return SignedTokenAuthentication().authenticate(request)
+
+    def assertRejected(self, token, message):
+        with self.assertRaisesMessage(AuthenticationFailed, message):
+            self.authenticate(token)
+
+    def login(self, **headers):
+        return self.client.post(
+            '/api/auth/login', {'email': 't@example.com', 'password': 'pw', 'userType': 'teacher'},
+            format='json', **headers
+        )
+
+    def test_login_issues_a_working_token(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        user, payload = self.authenticate(response.data['token'])
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_login_ignores_a_stale_token(self):
+        response = self.login(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(response.status_code, 200)
+
+    def test_register_ignores_a_stale_token(self):
+        response = self.client.post('/api/auth/register', {
+            'email': 'new@example.com', 'name': 'New', 'role': 'student', 'password': 'pw'
+        }, format='json', HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(response.status_code, 201)
+
+    def test_expired_token(self):
+        token = issue_token(self.user)
+        with mock.patch('api.authentication.TOKEN_MAX_AGE', -1):
+            self.assertRejected(token, 'Token has expired')
+
+    def test_tampered_token(self):
+        token = issue_token(self.user)
+        self.assertRejected(token[:-1] + ('A' if token[-1] != 'A' else 'B'), 'Invalid token')
+
+    def test_password_change_revokes_tokens(self):
+        token = issue_token(self.user)
+        self.authenticate(token)
+        self.user.set_password('new')
+        self.user.save()
+        self.assertRejected(token, 'Token has been revoked')
+
+    def test_saving_a_user_evicts_the_cached_copy(self):
+        token = issue_token(self.user)
+        self.authenticate(token)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertRejected(token, 'User not found or inactive')
+
+    def test_deleting_a_user_evicts_the_cached_copy(self):
+        token = issue_token(self.user)
+        self.authenticate(token)
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertRejected(token, 'User not found or inactive')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, QUERY_CACHE_ALIAS=None)
+class ClassLinkTests(APITestCase):
+    """Rows are linked to their Class on save and the list filters match on that key"""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(email='teacher@example.com', name='Teacher', role='teacher', password='pw')
+        cls.school_class = Class.objects.create(class_number=9, division='A', class_teacher=teacher)
+        cls.student = User.objects.create_user(
+            email='asha@example.com', name='Asha', role='student', className='9', division='a', password='pw'
+        )
+        User.objects.create_user(
+            email='ravi@example.com', name='Ravi', role='student', className='9', division='B', password='pw'
+        )
+
+    def class_lookups(self, queries):
+        table = connection.ops.quote_name(Class._meta.db_table)
+        return [sql for sql in (query['sql'] for query in queries) if sql.startswith('SELECT') and f'FROM {table}' in sql]
+
+    def test_saves_resolve_the_class_only_when_the_strings_change(self):
+        student = User.objects.get(pk=self.student.pk)
+        self.assertEqual(student.school_class, self.school_class)
+        with CaptureQueriesContext(connection) as queries:
+            student.name = 'Asha K'
+            student.save()
+        self.assertEqual(self.class_lookups(queries.captured_queries), [])
+        with CaptureQueriesContext(connection) as queries:
+            student.division = 'B'
+            student.save()
+        self.assertEqual(len(self.class_lookups(queries.captured_queries)), 1)
+        self.assertIsNone(student.school_class_id)
+
+    def test_class_filters_match_on_the_class_key(self):
+        for params in ({'className': '9', 'division': 'a'}, {'className': '9A'}):
+            with self.subTest(**params):
+                response = self.client.get('/api/users/', {'role': 'student', **params})
+                self.assertEqual([user['email'] for user in response.data['users']], ['asha@example.com'])
+        response = self.client.get('/api/users/', {'role': 'student', 'className': 'nine'})
+        self.assertEqual(response.data['users'], [])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TeachingAssignmentTests(APITestCase):
+    """The teacher-to-class table is filled from the JSON mapping and kept in step with it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_teacher, cls.maths, cls.science = (
+            User.objects.create_user(email=f'{name}@example.com', name=name, role='teacher', password='pw')
+            for name in ('class-teacher', 'maths', 'science')
+        )
+        cls.student = User.objects.create_user(email='student@example.com', name='S', role='student', password='pw')
+        cls.school_class = Class.objects.create(class_number=9, division='A', class_teacher=cls.class_teacher)
+
+    def pairs(self):
+        return set(TeachingAssignment.objects.values_list('school_class_id', 'subject', 'teacher_id'))
+
+    def test_backfill_migration(self):
+        migration = import_module('api.migrations.0015_teachingassignment')
+        Class.objects.filter(pk=self.school_class.pk).update(subject_teachers={
+            'Maths': self.maths.pk, 'Art': 'nobody', 'PE': self.student.pk, '': self.maths.pk,
+        })
+        Subject.objects.create(name='Science', class_name='9A', class_teacher=self.science)
+        TeachingAssignment.objects.all().delete()
+        migration.copy_subject_teachers(django_apps, None)
+        self.assertEqual(self.pairs(), {
+            (self.school_class.pk, 'Maths', self.maths.pk), (self.school_class.pk, 'Science', self.science.pk),
+        })
+
+    def test_class_save_syncs_assignments(self):
+        self.school_class.subject_teachers = {'Maths': self.maths.pk}
+        self.school_class.save()
+        self.assertEqual(self.pairs(), {(self.school_class.pk, 'Maths', self.maths.pk)})
+        self.school_class.subject_teachers = {'Science': self.science.pk}
+        self.school_class.save()
+        self.assertEqual(self.pairs(), {(self.school_class.pk, 'Science', self.science.pk)})
+        response = self.client.get('/api/classes/', {'teacher_id': self.science.pk})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.school_class.pk])
+        self.assertEqual(self.client.get('/api/classes/', {'teacher_id': self.maths.pk}).json()['count'], 0)
+
+    def test_non_numeric_teacher_id_is_rejected(self):
+        for url in ('/api/classes/', '/api/classes/by_class_teacher/', '/api/classes/teacher_dashboard/',
+                    '/api/classes/subject_teacher_dashboard/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, {'teacher_id': 'abc'}).status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, ATTENDANCE_STORAGE='sheets')
+class AttendanceSheetTests(APITestCase):
+    """The attendance routes read and write class-day sheets when ATTENDANCE_STORAGE is 'sheets'"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(email='teacher@example.com', name='T', role='teacher', password='pw')
+        cls.school_class = Class.objects.create(class_number=9, division='A', class_teacher=cls.teacher)
+        cls.students = [
+            User.objects.create_user(
+                email=f'student{n}@example.com', name=f'S{n}', role='student', className='9', division='A',
+                password='pw'
+            )
+            for n in range(3)
+        ]
+
+    def mark(self, day, present):
+        return self.client.post('/api/attendance/bulk_mark/', {
+            'classId': self.school_class.pk, 'teacherId': self.teacher.pk, 'date': day,
+            'records': [{'studentId': s.pk, 'present': p} for s, p in zip(self.students, present)],
+        }, format='json')
+
+    def statuses(self, **params):
+        response = self.client.get('/api/attendance/', params)
+        self.assertEqual(response.status_code, 200)
+        return {(row['student'], row['date']): row['status'] for row in response.data['results']}
+
+    def test_marks_round_trip_across_a_month_boundary(self):
+        self.assertEqual(self.mark('2024-04-30', [True, False, True]).status_code, 200)
+        self.assertEqual(self.mark('2024-05-01', [False, True, True]).status_code, 200)
+        first, second, third = (s.pk for s in self.students)
+        self.assertEqual(self.statuses(start_date='2024-04-30', end_date='2024-05-01'), {
+            (first, '2024-04-30'): 'Present', (second, '2024-04-30'): 'Absent', (third, '2024-04-30'): 'Present',
+            (first, '2024-05-01'): 'Absent', (second, '2024-05-01'): 'Present', (third, '2024-05-01'): 'Present',
+        })
+        self.assertEqual(set(self.statuses(date='2024-05-01')), {(pk, '2024-05-01') for pk in (first, second, third)})
+        self.assertEqual(
+            list(AttendanceSheet.objects.order_by('date').values_list('date', flat=True)),
+            [date(2024, 4, 30), date(2024, 5, 1)],
+        )
+
+    def test_impossible_dates_are_rejected(self):
+        self.assertEqual(self.mark('2024-04-31', [True, True, True]).status_code, 400)
+        self.assertFalse(AttendanceSheet.objects.exists())
+        for params in ({'date': '2024-04-31'}, {'start_date': '2024-04-31', 'end_date': '2024-05-01'}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get('/api/attendance/', params).status_code, 400)
+
+    def test_a_later_mark_overwrites_an_earlier_one(self):
+        self.mark('2024-04-30', [True, True, True])
+        response = self.mark('2024-04-30', [False, True, False])
+        self.assertEqual([result['status'] for result in response.data['results']], ['updated'] * 3)
+        first, second, third = (s.pk for s in self.students)
+        self.assertEqual(self.statuses(date='2024-04-30'), {
+            (first, '2024-04-30'): 'Absent', (second, '2024-04-30'): 'Present', (third, '2024-04-30'): 'Absent',
+        })
+        self.assertEqual(AttendanceSheet.objects.count(), 1)
+
+    def test_keyset_paging(self):
+        days = ['2024-04-29', '2024-04-30', '2024-05-01']
+        for day in days:
+            self.mark(day, [True, False, True])
+        rows, url, params = [], '/api/attendance/', {'academic_year': 2023}
+        with mock.patch.object(DateKeysetPagination, 'page_size', 2):
+            while url:
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(response.data['results']), 2)
+                rows += [(row['date'], row['student']) for row in response.data['results']]
+                url, params = response.data['next'], None
+        self.assertEqual(len(rows), len(set(rows)))
+        self.assertEqual(sorted(rows), sorted((day, s.pk) for day in days for s in self.students))
+        self.assertEqual([day for day, _ in rows], sorted((day for day, _ in rows), reverse=True))
+        self.assertEqual(self.client.get('/api/attendance/', {'page': 2}).status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RolloverTests(TestCase):
+    """Year-end rollover promotes students, graduates the final class and keeps the caches right"""
+
+    def setUp(self):
+        user_cache.clear()
+        self.teachers = {
+            number: User.objects.create_user(
+                email=f'teacher{number}@example.com', name=f'T{number}', role='teacher', password='pw'
+            )
+            for number in (9, 10)
+        }
+        self.classes = {
+            number: Class.objects.create(class_number=number, division='A', class_teacher=teacher)
+            for number, teacher in self.teachers.items()
+        }
+        self.students = {
+            name: User.objects.create_user(
+                email=f'{name}@example.com', name=name, role='student', className=name[:-1], division='A',
+                password='pw'
+            )
+            for name in ('9a', '10a', '8a')
+        }
+
+    def test_promotes_and_graduates(self):
+        summary = rollover_academic_year(2024)
+        self.assertEqual(
+            {key: summary[key] for key in ('snapshot', 'graduated', 'promoted', 'created_classes')},
+            {'snapshot': 2, 'graduated': 1, 'promoted': 1, 'created_classes': []},
+        )
+        promoted, graduate = (User.objects.get(pk=self.students[name].pk) for name in ('9a', '10a'))
+        self.assertEqual((promoted.school_class_id, promoted.className), (self.classes[10].pk, '10'))
+        self.assertEqual((graduate.school_class_id, graduate.is_active), (None, False))
+        self.assertEqual(
+            dict(Class.objects.values_list('class_number', 'students_count')), {9: 0, 10: 1}
+        )
+        self.assertEqual(ClassMembership.objects.filter(academic_year=2024).count(), 2)
+        with self.assertRaises(ValueError):
+            rollover_academic_year(2024)
+
+    def test_missing_classes_are_created(self):
+        Class.objects.create(class_number=8, division='B')
+        User.objects.create_user(email='8b@example.com', name='8b', role='student', className='8', division='B')
+        summary = rollover_academic_year(2024)
+        self.assertEqual(len(summary['created_classes']), 1)
+        self.assertTrue(Class.objects.filter(class_number=9, division='B', students_count=1).exists())
+
+    def test_teachers_follow_their_students(self):
+        rollover_academic_year(2024, teachers='follow')
+        self.assertEqual(
+            dict(Class.objects.values_list('class_number', 'class_teacher_id')),
+            {9: self.teachers[10].pk, 10: self.teachers[9].pk},
+        )
+
+    def test_graduates_can_no_longer_authenticate(self):
+        graduate = self.students['10a']
+        token = issue_token(graduate)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(SignedTokenAuthentication().authenticate(request)[0].pk, graduate.pk)
+        rollover_academic_year(2024)
+        with self.assertRaisesMessage(AuthenticationFailed, 'User not found or inactive'):
+            SignedTokenAuthentication().authenticate(request)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class IntegrityTests(TestCase):
+    """The audit reads class strings the way the save-time linker does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(email='teacher@example.com', name='T', role='teacher', password='pw')
+        cls.school_class = Class.objects.create(class_number=9, division='A', class_teacher=teacher)
+        spellings = [('9', 'a'), ('9a', ''), ('9A', None), (' 9 ', ' A'), ('9A', 'A')]
+        cls.named = [
+            User.objects.create_user(
+                email=f'student{n}@example.com', name=f'S{n}', role='student', className=class_name,
+                division=division, password='pw'
+            ).pk
+            for n, (class_name, division) in enumerate(spellings)
+        ]
+        cls.missing = User.objects.create_user(
+            email='other@example.com', name='O', role='student', className='9', division='B', password='pw'
+        ).pk
+        cls.subject = Subject.objects.create(name='Maths', class_name='9a').pk
+
+    def test_rows_the_linker_would_link_count_as_unlinked(self):
+        self.assertEqual(
+            set(User.objects.filter(pk__in=self.named).values_list('school_class_id', flat=True)),
+            {self.school_class.pk},
+        )
+        User.objects.update(school_class=None)
+        Subject.objects.update(school_class=None)
+        self.assertEqual(set(unlinked_rows(User).values_list('pk', flat=True)), set(self.named))
+        self.assertEqual(list(missing_class_rows(User).values_list('pk', flat=True)), [self.missing])
+        self.assertEqual(list(unlinked_rows(Subject).values_list('pk', flat=True)), [self.subject])
+        self.assertEqual(repair_rows(lambda: unlinked_rows(User), link_rows(User)), len(self.named))
+        self.assertFalse(unlinked_rows(User).exists())
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS,
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'query': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-cache-tests'},
+    },
+)
+class QueryCacheContentTests(APITestCase):
+    """Rows written to the query cache never carry a user's credentials"""
+
+    def test_cached_rows_leave_out_password_hashes(self):
+        teacher = User.objects.create_user(email='teacher@example.com', name='T', role='teacher', password='pw')
+        school_class = Class.objects.create(class_number=9, division='A', class_teacher=teacher)
+        Subject.objects.create(name='Maths', class_name='9A', class_teacher=teacher)
+        for url in ('/api/classes/', f'/api/classes/{school_class.pk}/', '/api/subjects/',
+                    f'/api/classes/by_class_teacher/?teacher_id={teacher.pk}'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        cached = caches['query']._cache.values()
+        self.assertTrue(cached)
+        secret = teacher.password.rsplit('$', 1)[-1].encode()
+        self.assertFalse([value for value in cached if secret in value])
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS,
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'query': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'conditional-get-tests'},
+    },
+)
+class ConditionalGetTests(APITestCase):
+    """Row data lists and details answer 304 from one aggregate, without rendering"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(email='teacher@example.com', name='T', role='teacher', password='pw')
+        cls.school_class = Class.objects.create(class_number=9, division='A', class_teacher=cls.teacher)
+        cls.student = User.objects.create_user(
+            email='student@example.com', name='S', role='student', className='9', division='A', password='pw'
+        )
+        cls.attendance = Attendance.objects.create(
+            student=cls.student, teacher=cls.teacher, date=date(2024, 7, 1), status='Present',
+            class_name='9', division='A'
+        )
+
+    def setUp(self):
+        caches['query'].clear()
+
+    def revalidate(self, url, response):
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        return again, len(queries)
+
+    def test_unchanged_rows_are_not_modified(self):
+        for url in ('/api/attendance/', f'/api/attendance/{self.attendance.pk}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                again, queries = self.revalidate(url, response)
+                self.assertEqual((again.status_code, queries), (304, 1))
+                self.assertEqual(again['ETag'], response['ETag'])
+                since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(since.status_code, 304)
+
+    def test_changed_rows_and_joined_users_are_modified(self):
+        url = '/api/attendance/'
+        response = self.client.get(url)
+        Attendance.objects.create(
+            student=self.student, teacher=self.teacher, date=date(2024, 7, 2), status='Absent',
+            class_name='9', division='A'
+        )
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+        self.student.name = 'Renamed'
+        self.student.save()
+        renamed, _ = self.revalidate(url, again)
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.data['results'][0]['student_name'], 'Renamed')
+
+    def test_filters_are_part_of_the_validator(self):
+        response = self.client.get('/api/attendance/', {'date': '2024-07-01'})
+        other = self.client.get('/api/attendance/', {'date': '2024-07-02'})
+        self.assertNotEqual(response['ETag'], other['ETag'])
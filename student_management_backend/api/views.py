@@ -1,10 +1,33 @@
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from django.contrib.auth import authenticate
-from django.db.models import Q
-from .models import User, Class, Attendance, Leave, Subject, Event, Marks, Assignment, Resource
+from django.http import Http404
+from django.db.models import Q, Sum
+from django.utils.dateparse import parse_date
+from .models import (
+    User, Class, Attendance, AttendanceRollup, Leave, Subject, Event, Marks, Assignment, Resource,
+    TeachingAssignment, DashboardSnapshot, academic_year_of
+)
+from .archive import archive_rows, archived_years, year_filters
+from .attendance_sheets import (
+    filter_sheets, get_sheet_row, iter_sheet_rows, sheet_class, sheet_row_values, sheet_storage
+)
+from .authentication import TOKEN_MAX_AGE, issue_token
+from .dashboards import get_teacher_dashboard
+from .exports import CSVRenderer, NDJSONRenderer, JSONErrorsMixin, streaming_export, streaming_objects_export
+from .mixins import ConditionalGetMixin, EagerLoadingMixin, QueryCacheMixin, eager_load
+from .pagination import DateKeysetPagination, KeysetPagination
+from .query_cache import cached_get
+from .response_cache import cache_response
+from .rollups import attendance_totals, load_school_counters
+from .services import (
+    bulk_mark_attendance, class_filter, delete_sheet_row, import_users, mark_attendance_sheet, read_user_rows,
+    save_sheet_row
+)
 from .serializers import (
     UserSerializer, LoginSerializer, ClassSerializer,
     AttendanceSerializer, LeaveSerializer, SubjectSerializer, EventSerializer, MarksSerializer, AssignmentSerializer, ResourceSerializer
@@ -12,6 +35,8 @@ from .serializers import (
 
 # Authentication Views
 @api_view(['POST'])
+# Issues credentials: a stale token sent along must not block it
+@authentication_classes([])
 @permission_classes([AllowAny])
 def login_view(request):
     """Login endpoint"""
@@ -35,17 +60,21 @@ def login_view(request):
         if user.role.lower() != user_type.lower():
             return Response({'message': 'Invalid user type'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Return user data
+        # Return user data with a signed access token for later requests
         user_data = UserSerializer(user).data
         return Response({
             'message': 'Login successful',
-            'user': user_data
+            'user': user_data,
+            'token': issue_token(user),
+            'expires_in': TOKEN_MAX_AGE
         }, status=status.HTTP_200_OK)
         
     except User.DoesNotExist:
         return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['POST'])
+# Issues credentials: a stale token sent along must not block it
+@authentication_classes([])
 @permission_classes([AllowAny])
 def register_view(request):
     """Register new user"""
@@ -68,28 +97,47 @@ def register_view(request):
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def parse_date_range(request):
+    """(start_date, end_date) from the query params; None if either is malformed"""
+    dates = []
+    for param in ('start_date', 'end_date'):
+        value = request.query_params.get(param)
+        try:
+            parsed = parse_date(value) if value else None
+        except ValueError:
+            parsed = None
+        if value and parsed is None:
+            return None
+        dates.append(parsed)
+    return tuple(dates)
+
+def parse_academic_year(value):
+    if not str(value).isdigit():
+        raise ParseError('academic_year must be a year such as 2025')
+    return int(value)
+
+def parse_id(value, param):
+    if not str(value).isdigit():
+        raise ParseError(f'{param} must be a numeric id')
+    return int(value)
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def admin_dashboard_stats(request):
     """Get stats for admin dashboard"""
     try:
-        student_count = User.objects.filter(role='student').count()
-        teacher_count = User.objects.filter(role='teacher').count()
-        class_count = Class.objects.count()
-        
-        # Calculate attendance percentage for today
-        from datetime import date
-        today = date.today()
-        total_attendance = Attendance.objects.filter(date=today).count()
-        present_count = Attendance.objects.filter(date=today, status='Present').count()
+        # School-wide totals are maintained on write
+        counters = load_school_counters()
         
         attendance_percentage = 0
-        if total_attendance > 0:
-            attendance_percentage = (present_count / total_attendance) * 100
+        if counters.total_today > 0:
+            attendance_percentage = (counters.present_today / counters.total_today) * 100
             
         # Recent activity
-        recent_leaves = Leave.objects.all().order_by('-created_at')[:3]
-        recent_events = Event.objects.all().order_by('-created_at')[:2]
+        recent_leaves = Leave.objects.select_related('student').only(
+            'created_at', 'student__name'
+        ).order_by('-created_at')[:3]
+        recent_events = Event.objects.only('title', 'created_at').order_by('-created_at')[:2]
         
         activity = []
         for leave in recent_leaves:
@@ -106,9 +154,9 @@ def admin_dashboard_stats(request):
             
         return Response({
             'stats': {
-                'students': student_count,
-                'teachers': teacher_count,
-                'classes': class_count,
+                'students': counters.students,
+                'teachers': counters.teachers,
+                'classes': counters.classes,
                 'attendanceToday': f"{int(attendance_percentage)}%"
             },
             'recentActivity': activity
@@ -117,10 +165,12 @@ def admin_dashboard_stats(request):
         return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # User ViewSet
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    versioned_models = (User,)
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         queryset = User.objects.all()
@@ -130,16 +180,25 @@ class UserViewSet(viewsets.ModelViewSet):
         
         if role:
             queryset = queryset.filter(role=role)
-        if class_name:
-            queryset = queryset.filter(className=class_name)
-        if division:
-            queryset = queryset.filter(division=division)
+        queryset = queryset.filter(**class_filter(class_name, division))
         
         return queryset.order_by('-created_at')
     
+    @cache_response(User)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @cache_response(User)
     def list(self, request, *args, **kwargs):
         """Override list to return data in expected format"""
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        # Cursor pages are opt-in; plain requests keep the full user list
+        if self.paginator.use_keyset(request):
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = self.get_serializer(queryset, many=True)
         return Response({
             'users': serializer.data
@@ -166,6 +225,30 @@ class UserViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """Create many users from a JSON list or an uploaded CSV/JSON file"""
+        try:
+            upload = request.FILES.get('file')
+            if upload:
+                rows = read_user_rows(upload.read(), upload.name)
+            elif isinstance(request.data, list):
+                rows = request.data
+            else:
+                rows = request.data.get('users', [])
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'detail': f'Could not read users: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not rows:
+            return Response({'detail': 'No users to import'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        created_count, errors = import_users(rows)
+        return Response({
+            'message': f'{created_count} users imported, {len(errors)} rows rejected',
+            'created': created_count,
+            'errors': errors
+        }, status=status.HTTP_200_OK)
+    
     def destroy(self, request, *args, **kwargs):
         """Override destroy to return proper response"""
         instance = self.get_object()
@@ -175,10 +258,31 @@ class UserViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
 # Class ViewSet
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(ConditionalGetMixin, QueryCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [AllowAny]
+    versioned_models = (Class, User, TeachingAssignment)
+    
+    def get_queryset(self):
+        queryset = Class.objects.all()
+        teacher_id = self.request.query_params.get('teacher_id')
+        
+        # Classes in which this teacher teaches a subject
+        if teacher_id:
+            queryset = queryset.filter(
+                teaching_assignments__teacher_id=parse_id(teacher_id, 'teacher_id')
+            ).distinct()
+        
+        return queryset
+    
+    @cache_response(Class, User, TeachingAssignment)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response(Class, User)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'])
     def by_class_teacher(self, request):
@@ -187,134 +291,50 @@ class ClassViewSet(viewsets.ModelViewSet):
         
         if not teacher_id:
             return Response({'detail': 'teacher_id parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+        teacher_id = parse_id(teacher_id, 'teacher_id')
         
         try:
-            class_obj = Class.objects.get(class_teacher_id=teacher_id)
+            # Only the teacher columns the serializer renders: the cached row must not carry credentials
+            classes = eager_load(Class.objects.all(), self.get_serializer())
+            class_obj = cached_get(classes, class_teacher_id=teacher_id)
             serializer = self.get_serializer(class_obj)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Class.DoesNotExist:
             return Response({'detail': 'No class found for this teacher'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['get'])
+    def students(self, request, pk=None):
+        """Get the students enrolled in a class, or in a past ?academic_year"""
+        academic_year = request.query_params.get('academic_year')
+        if academic_year:
+            # Closed years are read from the rollover membership snapshot
+            students = User.objects.filter(
+                class_memberships__school_class_id=pk,
+                class_memberships__academic_year=parse_academic_year(academic_year),
+            ).order_by('name')
+        else:
+            students = User.objects.filter(school_class_id=pk, role='student').order_by('name')
+        students = eager_load(students, UserSerializer())
+        return Response({
+            'students': UserSerializer(students, many=True).data,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'])
+    @cache_response(Class, User, DashboardSnapshot, daily=True)
     def teacher_dashboard(self, request):
         """Get complete dashboard data for class teacher"""
         teacher_id = request.query_params.get('teacher_id')
         
         if not teacher_id:
             return Response({'detail': 'teacher_id parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+        teacher_id = parse_id(teacher_id, 'teacher_id')
         
         try:
-            # Get the class for this teacher
-            class_obj = Class.objects.get(class_teacher_id=teacher_id)
-            teacher = User.objects.get(id=teacher_id)
-            
-            # Get all students in this class
-            students = User.objects.filter(
-                className=class_obj.class_number,
-                division=class_obj.division,
-                role='student'
-            )
-            
-            # Get today's attendance
-            from datetime import date
-            today = date.today()
-            attendance_today = Attendance.objects.filter(
-                date=today,
-                class_name=f"{class_obj.class_number}{class_obj.division}"
-            )
-            
-            # Get pending leave requests for this class
-            pending_leaves = Leave.objects.filter(
-                status='Pending',
-                student__className=class_obj.class_number,
-                student__division=class_obj.division
-            )
-            
-            # Get events for this class
-            events = Event.objects.filter(
-                class_name=str(class_obj.class_number)
-            ).order_by('-date')
-            
-            # Get subjects for this class
-            subjects = Subject.objects.filter(
-                class_name=f"{class_obj.class_number}{class_obj.division}"
-            )
-            
-            # Calculate Academic Overview Data
-            academic_overview = []
-            for subject in subjects:
-                # 1. Average Marks
-                subject_marks = Marks.objects.filter(
-                    class_name=class_obj.class_number,
-                    division=class_obj.division,
-                    subject=subject.name
-                )
-                avg_marks = 0
-                if subject_marks.exists():
-                    total_percentage = sum([m.percentage for m in subject_marks if m.percentage is not None])
-                    avg_marks = round(total_percentage / subject_marks.count(), 1)
-                
-                # 2. Pending Assignments (Due date >= today)
-                pending_count = Assignment.objects.filter(
-                    class_name=class_obj.class_number,
-                    division=class_obj.division,
-                    subject=subject.name,
-                    due_date__gte=date.today()
-                ).count()
-                
-                # 3. Latest Resource
-                latest_resource = Resource.objects.filter(
-                    class_name=class_obj.class_number,
-                    division=class_obj.division,
-                    subject=subject.name
-                ).order_by('-created_at').first()
-                
-                latest_resource_title = latest_resource.title if latest_resource else "No resources"
-                
-                # 4. Last Updated (Max of created_at/updated_at from all related models)
-                last_updated = "N/A"
-                dates = []
-                
-                if latest_resource:
-                    dates.append(latest_resource.created_at)
-                
-                latest_assignment = Assignment.objects.filter(
-                    class_name=class_obj.class_number,
-                    division=class_obj.division,
-                    subject=subject.name
-                ).order_by('-created_at').first()
-                if latest_assignment:
-                    dates.append(latest_assignment.created_at)
-                    
-                latest_mark = subject_marks.order_by('-updated_at').first()
-                if latest_mark:
-                    dates.append(latest_mark.updated_at)
-                    
-                if dates:
-                    max_date = max(dates)
-                    last_updated = max_date.strftime("%Y-%m-%d")
-
-                academic_overview.append({
-                    'name': subject.name,
-                    'averageMarks': avg_marks,
-                    'pendingAssignments': pending_count,
-                    'latestResource': latest_resource_title,
-                    'lastUpdated': last_updated
-                })
-            
-            response_data = {
-                'class': ClassSerializer(class_obj).data,
-                'teacher': UserSerializer(teacher).data,
-                'students': UserSerializer(students, many=True).data,
-                'attendance_today': AttendanceSerializer(attendance_today, many=True).data,
-                'pending_leaves': LeaveSerializer(pending_leaves, many=True).data,
-                'events': EventSerializer(events, many=True).data,
-                'subjects': SubjectSerializer(subjects, many=True).data,
-                'academic_overview': academic_overview,  # Add this new field
-                'total_students': students.count(),
-                'present_today': attendance_today.filter(status='Present').count(),
-                'absent_today': attendance_today.filter(status='Absent').count(),
-            }
+            # Get the class for this teacher along with its stored dashboard
+            class_obj = Class.objects.select_related(
+                'class_teacher', 'dashboard_snapshot'
+            ).get(class_teacher_id=teacher_id)
+            response_data = get_teacher_dashboard(class_obj)
             
             return Response(response_data, status=status.HTTP_200_OK)
         except Class.DoesNotExist:
@@ -330,14 +350,18 @@ class ClassViewSet(viewsets.ModelViewSet):
         
         if not teacher_id:
             return Response({'detail': 'teacher_id parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+        teacher_id = parse_id(teacher_id, 'teacher_id')
         
         try:
             teacher = User.objects.get(id=teacher_id)
             
-            # Find all subjects taught by this teacher
-            taught_subjects = Subject.objects.filter(class_teacher_id=teacher_id)
+            # Find all subjects taught by this teacher, with their classes
+            assignments = list(
+                TeachingAssignment.objects.filter(teacher_id=teacher_id)
+                .select_related('school_class').order_by('pk')
+            )
             
-            if not taught_subjects.exists():
+            if not assignments:
                 return Response({
                     'teacher': UserSerializer(teacher).data,
                     'classes': [],
@@ -346,28 +370,21 @@ class ClassViewSet(viewsets.ModelViewSet):
                     'message': 'No subjects assigned to this teacher'
                 }, status=status.HTTP_200_OK)
 
-            # Get unique classes from subjects
-            class_names = taught_subjects.values_list('class_name', flat=True).distinct()
+            # One entry per class, with the first subject taught there
             classes_data = []
-            
-            for c_name in class_names:
-                # Parse "9A" -> 9, "A"
-                import re
-                match = re.match(r"(\d+)([A-Z]+)", c_name)
-                if match:
-                    c_num = int(match.group(1))
-                    c_div = match.group(2)
-                    try:
-                        cls = Class.objects.get(class_number=c_num, division=c_div)
-                        classes_data.append({
-                            'id': cls.id,
-                            'name': c_name,
-                            'class_number': cls.class_number,
-                            'division': cls.division,
-                            'subject': taught_subjects.filter(class_name=c_name).first().name
-                        })
-                    except Class.DoesNotExist:
-                        continue
+            seen_class_ids = set()
+            for assignment in assignments:
+                cls = assignment.school_class
+                if cls.id in seen_class_ids:
+                    continue
+                seen_class_ids.add(cls.id)
+                classes_data.append({
+                    'id': cls.id,
+                    'name': f"{cls.class_number}{cls.division}",
+                    'class_number': cls.class_number,
+                    'division': cls.division,
+                    'subject': assignment.subject
+                })
 
             # If class_id provided, filter for that class, else use first class
             selected_class = None
@@ -382,19 +399,15 @@ class ClassViewSet(viewsets.ModelViewSet):
             
             if selected_class:
                 # Get students for selected class
-                students = User.objects.filter(
-                    className=selected_class['class_number'],
-                    division=selected_class['division'],
-                    role='student'
-                )
+                students = User.objects.filter(school_class_id=selected_class['id'], role='student')
                 students_data = UserSerializer(students, many=True).data
                 
                 # Get marks for these students for the teacher's subject
                 marks = Marks.objects.filter(
-                    class_name=selected_class['class_number'],
-                    division=selected_class['division'],
+                    school_class_id=selected_class['id'],
                     subject=selected_class['subject']
                 )
+                marks = eager_load(marks, MarksSerializer())
                 marks_data = MarksSerializer(marks, many=True).data
 
             return Response({
@@ -411,25 +424,153 @@ class ClassViewSet(viewsets.ModelViewSet):
             return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Attendance ViewSet
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(JSONErrorsMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [AllowAny]
+    pagination_class = DateKeysetPagination
     
     def get_queryset(self):
-        queryset = Attendance.objects.all()
-        student_id = self.request.query_params.get('student')
-        date = self.request.query_params.get('date')
-        class_name = self.request.query_params.get('className')
+        return Attendance.objects.filter(**self.attendance_filters()).order_by('-date')
+    
+    def validator_queryset(self, queryset):
+        if not sheet_storage():
+            return super().validator_queryset(queryset)
+        # A sheet-mode list is as fresh as its sheets; single rows are ETagged when rendered
+        return filter_sheets(**self.attendance_filters()) if self.action == 'list' else None
+    
+    def attendance_filters(self):
+        """Lookups of the list query params, valid on the live and the archive table.
+
+        Dates also become ``academic_year`` lookups, so MySQL reads only the
+        partitions of the years asked for.
+        """
+        params = self.request.query_params
+        date_range = parse_date_range(self.request)
+        if date_range is None:
+            raise ParseError('start_date and end_date must be in YYYY-MM-DD format')
+        start_date, end_date = date_range
+        try:
+            day = parse_date(params['date']) if params.get('date') else None
+        except ValueError:
+            day = None
+        if params.get('date') and day is None:
+            raise ParseError('date must be in YYYY-MM-DD format')
+        filters = {
+            'student_id': params.get('student') and parse_id(params['student'], 'student'),
+            'date': day,
+            'date__gte': start_date,
+            'date__lte': end_date,
+        }
+        filters = {key: value for key, value in filters.items() if value}
+        filters.update(class_filter(params.get('className'), params.get('division')))
+        if params.get('academic_year'):
+            filters['academic_year'] = parse_academic_year(params['academic_year'])
+        elif day:
+            filters['academic_year'] = academic_year_of(day)
+        else:
+            filters.update(year_filters(start_date, end_date))
+        return filters
+    
+    # With ATTENDANCE_STORAGE = 'sheets' the same routes read and write
+    # class-day sheets through api.attendance_sheets
+    def list(self, request, *args, **kwargs):
+        if not sheet_storage():
+            filters = self.attendance_filters()
+            years = archived_years(Attendance, filters)
+            if not years:
+                return super().list(request, *args, **kwargs)
+            # Archived years asked for by date: their rows are merged in, newest first
+            archived = eager_load(archive_rows(Attendance, years, **filters), self.get_serializer())
+            page = self.paginator.paginate_merged(self.filter_queryset(self.get_queryset()), archived, request, self)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        filters = self.attendance_filters()
+        page = self.paginator.paginate_sheets(filter_sheets(**filters), request, filters.get('student_id'))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+    
+    def get_object(self):
+        if not sheet_storage():
+            return super().get_object()
+        row = get_sheet_row(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        if row is None:
+            raise Http404
+        self.check_object_permissions(self.request, row)
+        return row
+    
+    def perform_create(self, serializer):
+        if not sheet_storage():
+            return super().perform_create(serializer)
+        serializer.instance = self.write_sheet_row(serializer)
+    
+    def perform_update(self, serializer):
+        if not sheet_storage():
+            return super().perform_update(serializer)
+        serializer.instance = self.write_sheet_row(serializer)
+    
+    def perform_destroy(self, instance):
+        if not sheet_storage():
+            return super().perform_destroy(instance)
+        delete_sheet_row(instance)
+    
+    @staticmethod
+    def write_sheet_row(serializer):
+        values = sheet_row_values(serializer.validated_data, serializer.instance)
+        class_obj = sheet_class(values)
+        if class_obj is None:
+            raise ValidationError({'class_name': ['No class matches this attendance row']})
+        return save_sheet_row(class_obj, values, serializer.instance)
+    
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Stream attendance rows as CSV or NDJSON (?format=csv|ndjson), filtered as the list is"""
+        filters = self.attendance_filters()
+        columns = {
+            'id': 'id',
+            'date': 'date',
+            'student_id': 'student_id',
+            'student_name': 'student__name',
+            'status': 'status',
+            'class_name': 'class_name',
+            'division': 'division',
+            'teacher_id': 'teacher_id',
+            'marked_by': 'teacher__name',
+            'updated_by': 'updated_by',
+        }
+        
+        if sheet_storage():
+            rows = iter_sheet_rows(filter_sheets(**filters), filters.get('student_id'))
+            return streaming_objects_export(rows, columns, 'attendance', request.accepted_renderer.format)
+        
+        years = archived_years(Attendance, filters)
+        archived = archive_rows(Attendance, years, **filters) if years else None
+        return streaming_export(
+            Attendance.objects.filter(**filters), columns, 'attendance', request.accepted_renderer.format, archived
+        )
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Daily present/absent counts for a date range, read from the roll-up"""
+        start_date, end_date = parse_date_range(request) or (None, None)
+        class_name = request.query_params.get('className')
+        division = request.query_params.get('division')
         
-        if student_id:
-            queryset = queryset.filter(student_id=student_id)
-        if date:
-            queryset = queryset.filter(date=date)
+        if not start_date or not end_date:
+            return Response({'detail': 'start_date and end_date parameters required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        filters = {'date__gte': start_date, 'date__lte': end_date}
         if class_name:
-            queryset = queryset.filter(class_name=class_name)
+            filters['class_name'] = class_name
+        if division:
+            filters['division'] = division
         
-        return queryset.order_by('-date')
+        days = AttendanceRollup.objects.filter(**filters).values('date').annotate(
+            present=Sum('present'), absent=Sum('absent'), total=Sum('total')
+        ).order_by('date')
+        
+        return Response({
+            'days': list(days),
+            'totals': attendance_totals(**filters)
+        }, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['post'])
     def bulk_mark(self, request):
@@ -446,42 +587,23 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            attendance_date = parse_date(str(date))
+            if attendance_date is None:
+                return Response({'detail': 'date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+            
             # Get the class to get class details
-            class_obj = Class.objects.get(id=class_id)
+            class_obj = cached_get(Class.objects.all(), id=class_id)
             teacher = User.objects.get(id=teacher_id)
-            class_name = f"{class_obj.class_number}{class_obj.division}"
             
-            created_count = 0
-            
-            # Create or update attendance records
-            for record in records:
-                student_id = record.get('studentId')
-                present = record.get('present', False)
-                
-                if not student_id:
-                    continue
-                
-                student = User.objects.get(id=student_id)
-                status_value = 'Present' if present else 'Absent'
-                
-                # Delete existing record for this date and student
-                Attendance.objects.filter(student_id=student_id, date=date).delete()
-                
-                # Create new record
-                attendance = Attendance.objects.create(
-                    student=student,
-                    teacher=teacher,
-                    date=date,
-                    status=status_value,
-                    class_name=str(class_obj.class_number),
-                    division=class_obj.division,
-                    marked_by=teacher.name
-                )
-                created_count += 1
+            # Validate all students and write every record in one transaction
+            mark = mark_attendance_sheet if sheet_storage() else bulk_mark_attendance
+            results = mark(class_obj, teacher, attendance_date, records)
+            created_count = sum(1 for r in results if r['status'] in ('created', 'updated'))
             
             return Response({
                 'message': f'Attendance marked successfully for {created_count} students',
-                'count': created_count
+                'count': created_count,
+                'results': results
             }, status=status.HTTP_200_OK)
             
         except Class.DoesNotExist:
@@ -541,10 +663,11 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 #         return super().update(request, *args, **kwargs)
 
 
-class LeaveViewSet(viewsets.ModelViewSet):
+class LeaveViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Leave.objects.all()
     serializer_class = LeaveSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         queryset = Leave.objects.all()
@@ -613,35 +736,38 @@ class LeaveViewSet(viewsets.ModelViewSet):
 #         return super().update(request, *args, **kwargs)
 
 # Subject ViewSet
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(ConditionalGetMixin, QueryCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [AllowAny]
+    versioned_models = (Subject, User)
     
     def get_queryset(self):
         queryset = Subject.objects.all()
         class_name = self.request.query_params.get('className')
         class_id = self.request.query_params.get('class_id')
         
-        if class_name:
-            queryset = queryset.filter(class_name=class_name)
+        queryset = queryset.filter(**class_filter(class_name))
         
-        # Filter by class_id - need to construct class_name from Class model
         if class_id:
-            try:
-                class_obj = Class.objects.get(id=class_id)
-                constructed_class_name = f"{class_obj.class_number}{class_obj.division}"
-                queryset = queryset.filter(class_name=constructed_class_name)
-            except Class.DoesNotExist:
-                queryset = queryset.none()
+            queryset = queryset.filter(school_class_id=class_id)
         
         return queryset
+    
+    @cache_response(Subject, User)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response(Subject, User)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 # Event ViewSet
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, QueryCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [AllowAny]
+    versioned_models = (Event,)
     
     def get_queryset(self):
         queryset = Event.objects.all()
@@ -651,33 +777,88 @@ class EventViewSet(viewsets.ModelViewSet):
         if audience:
             queryset = queryset.filter(Q(audience='ALL') | Q(audience=audience))
         if class_name:
-            queryset = queryset.filter(Q(audience='ALL') | Q(class_name=class_name))
+            queryset = queryset.filter(Q(audience='ALL') | Q(**class_filter(class_name)))
         
         return queryset.order_by('-date')
+    
+    @cache_response(Event)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response(Event)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 # Marks ViewSet
-class MarksViewSet(viewsets.ModelViewSet):
+class MarksViewSet(JSONErrorsMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Marks.objects.all()
     serializer_class = MarksSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        queryset = Marks.objects.all()
-        student_id = self.request.query_params.get('student_id')
-        class_name = self.request.query_params.get('class_name')
-        subject = self.request.query_params.get('subject')
-        exam_type = self.request.query_params.get('exam_type')
-        
-        if student_id:
-            queryset = queryset.filter(student_id=student_id)
-        if class_name:
-            queryset = queryset.filter(class_name=class_name)
-        if subject:
-            queryset = queryset.filter(subject=subject)
-        if exam_type:
-            queryset = queryset.filter(exam_type=exam_type)
-        
-        return queryset.order_by('-created_at')
+        return Marks.objects.filter(**self.marks_filters()).order_by('-created_at')
+    
+    def marks_filters(self):
+        """Lookups of the list query params, valid on the live and the archive table"""
+        params = self.request.query_params
+        filters = {
+            'student_id': params.get('student_id') and parse_id(params['student_id'], 'student_id'),
+            'subject': params.get('subject'),
+            'exam_type': params.get('exam_type'),
+        }
+        filters = {key: value for key, value in filters.items() if value}
+        filters.update(class_filter(params.get('class_name'), params.get('division')))
+        if params.get('academic_year'):
+            filters['academic_year'] = parse_academic_year(params['academic_year'])
+        return filters
+    
+    def list(self, request, *args, **kwargs):
+        filters = self.marks_filters()
+        years = archived_years(Marks, filters)
+        if not years:
+            return super().list(request, *args, **kwargs)
+        # An archived year asked for: its rows come from the archive table
+        archived = eager_load(archive_rows(Marks, years, **filters), self.get_serializer())
+        page = self.paginator.paginate_merged(self.filter_queryset(self.get_queryset()), archived, request, self)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+    
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Stream marks as CSV or NDJSON (?format=csv|ndjson), filtered as the list is plus a date range"""
+        filters = self.marks_filters()
+        
+        date_range = parse_date_range(request)
+        if date_range is None:
+            return Response({'detail': 'start_date and end_date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+        start_date, end_date = date_range
+        dates = {}
+        if start_date:
+            dates['created_at__date__gte'] = start_date
+        if end_date:
+            dates['created_at__date__lte'] = end_date
+        lookups = {**filters, **dates}
+        if 'academic_year' not in lookups:
+            lookups.update(year_filters(start_date, end_date))
+        queryset = Marks.objects.filter(**lookups)
+        years = archived_years(Marks, lookups)
+        archived = archive_rows(Marks, years, **lookups) if years else None
+        return streaming_export(queryset, {
+            'id': 'id',
+            'student_id': 'student_id',
+            'student_name': 'student__name',
+            'subject': 'subject',
+            'class_name': 'class_name',
+            'division': 'division',
+            'exam_type': 'exam_type',
+            'marks_obtained': 'marks_obtained',
+            'total_marks': 'total_marks',
+            'percentage': 'percentage',
+            'remarks': 'remarks',
+            'teacher_id': 'teacher_id',
+            'teacher_name': 'teacher__name',
+            'created_at': 'created_at',
+        }, 'marks', request.accepted_renderer.format, archived)
     
     @action(detail=False, methods=['get'])
     def by_class(self, request):
@@ -688,11 +869,11 @@ class MarksViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'class_id parameter required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            class_obj = Class.objects.get(id=class_id)
+            class_obj = cached_get(Class.objects.all(), id=class_id)
             marks = Marks.objects.filter(
-                class_name=class_obj.class_number,
-                division=class_obj.division
+                school_class=class_obj
             ).order_by('student__name', 'subject', 'exam_type')
+            marks = eager_load(marks, self.get_serializer())
             
             serializer = self.get_serializer(marks, many=True)
             return Response({
@@ -702,7 +883,7 @@ class MarksViewSet(viewsets.ModelViewSet):
         except Class.DoesNotExist:
             return Response({'detail': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+class AssignmentViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
     permission_classes = [AllowAny]
@@ -713,16 +894,13 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         division = self.request.query_params.get('division')
         teacher_id = self.request.query_params.get('teacher_id')
         
-        if class_name:
-            queryset = queryset.filter(class_name=class_name)
-        if division:
-            queryset = queryset.filter(division=division)
+        queryset = queryset.filter(**class_filter(class_name, division))
         if teacher_id:
             queryset = queryset.filter(teacher_id=teacher_id)
             
         return queryset.order_by('-due_date')
 
-class ResourceViewSet(viewsets.ModelViewSet):
+class ResourceViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
     permission_classes = [AllowAny]
@@ -734,10 +912,7 @@ class ResourceViewSet(viewsets.ModelViewSet):
         teacher_id = self.request.query_params.get('teacher_id')
         subject = self.request.query_params.get('subject')
         
-        if class_name:
-            queryset = queryset.filter(class_name=class_name)
-        if division:
-            queryset = queryset.filter(division=division)
+        queryset = queryset.filter(**class_filter(class_name, division))
         if teacher_id:
             queryset = queryset.filter(teacher_id=teacher_id)
         if subject:
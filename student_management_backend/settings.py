@@ -115,7 +115,9 @@ CORS_ALLOW_CREDENTIALS = True
 
 # REST Framework settings
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.SignedTokenAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Change later for security
     ],
@@ -123,5 +125,10 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 100
 }
 
+# Signed API access tokens (seconds) and the per-process user cache
+API_TOKEN_MAX_AGE = 60 * 60 * 12
+API_USER_CACHE_SIZE = 1024
+API_USER_CACHE_TTL = 300
+
 # Custom User Model
 AUTH_USER_MODEL = 'api.User'
\ No newline at end of file
@@ -1,6 +1,7 @@
 """
 Django settings for student_management_backend project.
 """
+import importlib.util
 import os
 from pathlib import Path
 
@@ -115,13 +116,50 @@ CORS_ALLOW_CREDENTIALS = True
 
 # REST Framework settings
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.SignedTokenAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Change later for security
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 100
+    'PAGE_SIZE': 100,
+    # orjson-backed JSON by default; MessagePack on `Accept: application/msgpack`
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'api.renderers.MessagePackRenderer')
+
+# Signed API access tokens (seconds) and the per-process user cache
+API_TOKEN_MAX_AGE = 60 * 60 * 12
+API_USER_CACHE_SIZE = 1024
+API_USER_CACHE_TTL = 300
+
+# Attendance storage: 'rows' (one row per student per day) or 'sheets'
+# (one packed row per class per day, see api/attendance_sheets.py)
+ATTENDANCE_STORAGE = 'rows'
+
+# First month of the academic year; academic year 2025 runs June 2025 to May 2026
+ACADEMIC_YEAR_START_MONTH = 6
+
+# Query result cache (api/query_cache.py). The file cache is shared by every
+# worker on the host, so a version bump in one is seen by all at once; a
+# local-memory cache only suits a single process. None disables it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'query': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('QUERY_CACHE_DIR', str(BASE_DIR / '.cache' / 'query')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
+QUERY_CACHE_ALIAS = 'query'
+QUERY_CACHE_TIMEOUT = 300
 
 # Custom User Model
 AUTH_USER_MODEL = "api.User"